@@ -0,0 +1,74 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Ensure local imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from data_loader import CSV_ENGINES, _identify_columns, _read_all_columns, _read_columns
+
+def largest_exports(source_path, count):
+    """
+    The `count` largest road exports (*.csv) found in the site folders of a source directory.
+    """
+    files = glob.glob(os.path.join(source_path, "*", "*.csv"))
+    return sorted(files, key=os.path.getsize, reverse=True)[:count]
+
+def _same_values(a, b):
+    """
+    Compares a column read by two readers: numerically when both parse as numbers, as text otherwise.
+    """
+    num_a, num_b = pd.to_numeric(a, errors='coerce'), pd.to_numeric(b, errors='coerce')
+    if num_a.notna().sum() == a.notna().sum() and num_b.notna().sum() == b.notna().sum():
+        return np.allclose(num_a.to_numpy(dtype=float), num_b.to_numpy(dtype=float), equal_nan=True)
+    return a.astype(str).str.replace(',', '.').equals(b.astype(str).str.replace(',', '.'))
+
+def benchmark_file(file, repeat=3):
+    """
+    Best time (s) of each reader on one export: 'full' (previous reader, all columns) and the
+    column-pruned typed read per available engine. Returns {reader: seconds}, {reader: parity}.
+    """
+    header = pd.read_csv(file, sep=';', encoding='latin1', nrows=0).columns
+    found_cols = _identify_columns(header)
+    readers = {'full': lambda: _read_all_columns(file, found_cols)}
+    for engine in CSV_ENGINES:
+        readers[f"pruned {engine}"] = lambda engine=engine: _read_columns(file, found_cols, engines=[engine])
+
+    timings, frames = {}, {}
+    for name, read in readers.items():
+        best = np.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            frames[name] = read()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+
+    reference = frames['full']
+    parity = {}
+    for name, df in frames.items():
+        parity[name] = len(df) == len(reference) and all(
+            _same_values(reference[c].reset_index(drop=True), df[c].reset_index(drop=True))
+            for c in reference.columns if c != 'Datetime')
+    return timings, parity
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du lecteur CSV des exports routiers (lecture complète vs colonnes utiles typées).")
+    parser.add_argument("files", nargs="*", help="Fichiers CSV à mesurer (par défaut : les plus gros exports du dossier --source)")
+    parser.add_argument("--source", "-s", type=str, default=".", help="Dossier contenant les dossiers des sites (défaut : dossier courant)")
+    parser.add_argument("--count", "-n", type=int, default=3, help="Nombre de plus gros exports mesurés (défaut : 3)")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Nombre de lectures par lecteur, le meilleur temps est retenu (défaut : 3)")
+    args = parser.parse_args()
+
+    files = args.files or largest_exports(args.source, args.count)
+    if not files:
+        print(f"Aucun export CSV trouvé dans {args.source}")
+        sys.exit(1)
+    for file in files:
+        timings, parity = benchmark_file(file, args.repeat)
+        print(f"\n{file} ({os.path.getsize(file) / 1e6:.1f} Mo)")
+        for name, seconds in timings.items():
+            print(f"  {name:<16} {seconds:6.2f} s  x{timings['full'] / seconds:4.1f}  {'identique' if parity[name] else 'DIFFÉRENT'}")
@@ -6,15 +6,50 @@ import sys
 import json
 import re
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 # Ensure local imports work
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from data_loader import DataManager
 
-def build_dataset(source_path=None):
+def build_site(site, source_path=None, file_workers=1, incremental=False):
+    """
+    Rebuilds the Parquet store (and the hourly cube for road sites) of one site.
+    Module-level so that sites can be processed in a worker process. Returns the number of records.
+    """
+    site_id = site['id']
+    site_name = site['name']
+    print(f"\n--- Traitement du site : {site_name} (ID: {site_id}) ---")
+    
+    dm = DataManager()
+    # We manually trigger cache generation by accessing the data
+    dm.invalidate(site_id)
+        
+    # Calling get_data will save to Parquet automatically if data is found
+    # We pass csv_source_path which makes DataManager skip reading existing parquet and look in the source.
+    
+    df = dm.get_data(site_id, csv_source_path=source_path, workers=file_workers, incremental=incremental)
+    
+    if not df.empty:
+        # Note: get_data automatically saves to parquet inside (see DataManager logic)
+        print(f" Succès : {len(df)} enregistrements traités et sauvegardés dans parquet_store/{site_id}/")
+        if site.get('type') == 'routier':
+            # Compact hourly aggregate read by the road dashboard callbacks, kept when no file changed
+            if incremental and dm.cube_is_current(site_id):
+                print(f" Cube horaire : à jour, non recalculé")
+            else:
+                cube = dm.save_cube(site_id, df)
+                print(f" Cube horaire : {len(cube)} lignes sauvegardées dans cube_store/{site_id}.parquet")
+    else:
+        print(f" Avertissement : Aucune donnée trouvée pour {site_id}")
+    return len(df)
+
+def build_dataset(source_path=None, workers=1, incremental=False):
     """
     Reads all CSVs, processes them using DataManager logic, and forces cache regeneration (Parquet).
     This script is useful for batch processing or updating data manually.
+    With workers > 1, sites are processed in a process pool and each site parses its CSV files in parallel.
+    With incremental, only the CSV files that are new or changed since the last build are parsed.
     """
     print(f"--- Début de la conversion ETL (Mode Multi-Sites) ---")
     
@@ -53,31 +88,27 @@ def build_dataset(source_path=None):
     if source_path:
         print(f"Source dossier personnalisée : {source_path}")
 
-    for site in sites:
-        site_id = site['id']
-        site_name = site['name']
-        print(f"\n--- Traitement du site : {site_name} (ID: {site_id}) ---")
-        
-        # We manually trigger cache generation by accessing the data
-        if site_id in dm._data_cache:
-            del dm._data_cache[site_id]
-            
-        # Calling get_data will save to Parquet automatically if data is found
-        # We pass csv_source_path which makes DataManager skip reading existing parquet and look in the source.
-        
-        df = dm.get_data(site_id, csv_source_path=source_path)
-        
-        if not df.empty:
-            # Note: get_data automatically saves to parquet inside (see DataManager logic)
-            print(f" Succès : {len(df)} enregistrements traités et sauvegardés dans {site_id}.parquet")
-        else:
-            print(f" Avertissement : Aucune donnée trouvée pour {site_id}")
+    if workers > 1 and len(sites) > 1:
+        # Split the workers between sites and, inside each site, CSV files
+        site_workers = min(workers, len(sites))
+        file_workers = max(1, workers // site_workers)
+        print(f"Mode parallèle : {site_workers} site(s) à la fois, {file_workers} fichier(s) par site")
+        with ProcessPoolExecutor(max_workers=site_workers) as pool:
+            counts = list(pool.map(build_site, sites, [source_path] * len(sites), [file_workers] * len(sites), [incremental] * len(sites)))
+        print("\n--- Récapitulatif ---")
+        for site, count in zip(sites, counts):
+            print(f" {site['id']} : {count} enregistrements")
+    else:
+        for site in sites:
+            build_site(site, source_path, file_workers=workers, incremental=incremental)
 
     print("\n--- Terminé avec succès ! ---")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Génération du dataset Parquet pour le Dashboard.")
     parser.add_argument("--source", "-s", type=str, help="Chemin vers le dossier contenant les dossiers des sites (ex: C:/Data)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Nombre de processus pour traiter les sites et leurs fichiers CSV en parallèle (défaut : 1)")
+    parser.add_argument("--incremental", "-i", action="store_true", help="N'ingère que les fichiers CSV nouveaux ou modifiés depuis la dernière construction")
     args = parser.parse_args()
     
-    build_dataset(source_path=args.source)
+    build_dataset(source_path=args.source, workers=max(1, args.workers), incremental=args.incremental)
@@ -0,0 +1,221 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Marker file of a directory store holding its signature, rewritten by write_signature on every
+# change of the store. The leading underscore keeps it out of the Parquet dataset files.
+SIGNATURE_FILE = '_signature.json'
+
+# --- Helpers ---
+
+def file_signature(path):
+    """
+    (mtime, size) of a file, used to detect a rebuilt store. None if the file does not exist.
+    For a directory (partitioned dataset), latest mtime and total size of the files it contains,
+    read from its SIGNATURE_FILE (the directory is only walked for stores written without one).
+    """
+    if os.path.isdir(path):
+        try:
+            with open(os.path.join(path, SIGNATURE_FILE), encoding='utf-8') as f:
+                return tuple(json.load(f))
+        except (OSError, ValueError):
+            return _walk_signature(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _walk_signature(path):
+    try:
+        latest, total = os.stat(path).st_mtime_ns, 0
+    except OSError:
+        return None
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name == SIGNATURE_FILE:
+                continue
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            latest = max(latest, st.st_mtime_ns)
+            total += st.st_size
+    return (latest, total)
+
+def write_signature(path):
+    """
+    Walks a directory store once and records its signature in its SIGNATURE_FILE, for
+    file_signature to read on every cache lookup. To be called by the writer after each change.
+    """
+    signature = _walk_signature(path)
+    marker = os.path.join(path, SIGNATURE_FILE)
+    tmp_path = f"{marker}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(signature, f)
+    os.replace(tmp_path, marker)
+    return signature
+
+def estimate_nbytes(value):
+    """
+    Approximate memory footprint of a cached value.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(v) for v in value.values())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+# --- Memory-mapped frames ---
+
+def save_mapped_frame(path, df, signature):
+    """
+    Writes a frame to an uncompressed Arrow IPC file that load_mapped_frame can map.
+    The signature of the source store is kept in the file metadata. The file is written
+    under a temporary name then renamed, so concurrent workers never map a partial file.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'source_signature'] = json.dumps(signature).encode()
+    table = table.replace_schema_metadata(metadata)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def load_mapped_frame(path, signature):
+    """
+    Maps an Arrow IPC file written by save_mapped_frame, None if it is missing or was written
+    from another version of the source store. Columns without missing values are read-only
+    views on the mapped pages, shared by every process that maps the file.
+    """
+    if pa is None or not os.path.exists(path):
+        return None
+    source = pa.memory_map(path, 'r')
+    reader = pa.ipc.open_file(source)
+    stored = (reader.schema.metadata or {}).get(b'source_signature')
+    if stored is None or json.loads(stored) != json.loads(json.dumps(signature)):
+        return None
+    return reader.read_all().to_pandas(split_blocks=True, self_destruct=True)
+
+# --- Cache ---
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by a memory budget (bytes) and/or a number of entries.
+    Each entry can carry a signature (e.g. the file_signature of its source); a lookup with a
+    different signature invalidates the entry. With a ttl (seconds), entries also expire that long
+    after being stored.
+    """
+
+    def __init__(self, max_bytes=None, max_entries=None, ttl=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, signature, nbytes, stored_at)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, signature=None):
+        """
+        Returns the cached value, or None on a miss or if the entry signature no longer matches.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, entry_signature, _, stored_at = entry
+            if entry_signature != signature:
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, signature=None, nbytes=None):
+        """
+        Stores a value and evicts the least recently used entries beyond the budget.
+        An entry larger than the whole budget is kept alone rather than dropped.
+        """
+        if nbytes is None:
+            nbytes = estimate_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, signature, nbytes, time.monotonic())
+            self._bytes += nbytes
+            while len(self._entries) > 1 and self._over_budget():
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, predicate=None):
+        """
+        Drops the entries whose key matches the predicate (all entries if None).
+        """
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for k in keys:
+                self._remove(k)
+            self.invalidations += len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'expirations': self.expirations,
+            }
+
+    def _over_budget(self):
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _remove(self, key):
+        nbytes = self._entries.pop(key)[2]
+        self._bytes -= nbytes
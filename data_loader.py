@@ -4,11 +4,31 @@ import os
 import numpy as np
 import json
 import re
-from utils import FRENCH_DAYS, TZ
+import hashlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from cache import LRUCache, file_signature, load_mapped_frame, save_mapped_frame, write_signature
+from utils import FRENCH_DAYS, DAYS_ORDER_FR, TZ, calendar_table, centered_rolling_mean, day_types, filter_by_date, filter_by_season, local_day_bounds, month_day, prefix_window_sum
+
+# Memory budget of the site cache (MB), shared by all the frames of all sites
+CACHE_MAX_MB = int(os.environ.get('DASHBOARD_CACHE_MB', 1024))
+
+# Filtered period frames shared by the callbacks fired by one change of the period (see DataManager.get_period)
+PERIOD_CACHE_ENTRIES = 32
+PERIOD_CACHE_TTL = 15 * 60
+
+# Site frame backend: 'memory' (each process holds its own copy) or 'mmap' (the frames are
+# mapped read-only from Arrow files in data/arrow_cache, shared by all the gunicorn workers)
+FRAME_BACKEND = os.environ.get('DASHBOARD_FRAME_BACKEND', 'memory')
+
+# Hive partitioning of the site stores: parquet_store/<site_id>/Year=YYYY/Month=M/
+PARTITION_COLUMNS = ['Year', 'Month']
 
 class DataManager:
     _instance = None
-    _data_cache = {}
+    # LRU cache of site frames, invalidated when their Parquet file is rebuilt
+    _data_cache = LRUCache(max_bytes=CACHE_MAX_MB * 1024 * 1024)
+    _period_cache = LRUCache(max_entries=PERIOD_CACHE_ENTRIES, ttl=PERIOD_CACHE_TTL)
     _base_path = os.path.dirname(os.path.abspath(__file__))
 
     def __new__(cls):
@@ -27,9 +47,140 @@ class DataManager:
                 print(f"Error loading sites.json: {e}")
         return []
 
-    def get_data(self, site_id, csv_source_path=None):
-        if site_id in self._data_cache:
-            return self._data_cache[site_id]
+    def _store_dir(self, site_id):
+        return os.path.join(self._base_path, "data", "parquet_store", site_id)
+
+    def _parquet_path(self, site_id):
+        """
+        Site store: the partitioned dataset directory, or the single <site_id>.parquet file
+        of stores built before the partitioning.
+        """
+        store_dir = self._store_dir(site_id)
+        if os.path.isdir(store_dir):
+            return store_dir
+        return f"{store_dir}.parquet"
+
+    def _mapped_path(self, name):
+        return os.path.join(self._base_path, "data", "arrow_cache", f"{name}.arrow")
+
+    def _share_frame(self, name, df, signature):
+        """
+        With the 'mmap' backend, swaps a frame read from a store for its memory-mapped copy
+        (written on first use, rewritten when the store signature changes).
+        """
+        if FRAME_BACKEND != 'mmap':
+            return df
+        try:
+            path = self._mapped_path(name)
+            save_mapped_frame(path, df, signature)
+            mapped = load_mapped_frame(path, signature)
+            if mapped is not None:
+                mapped.attrs = df.attrs
+                return mapped
+        except Exception as e:
+            print(f"Error mapping frame {name}: {e}")
+        return df
+
+    def _load_shared_frame(self, name, signature):
+        if FRAME_BACKEND != 'mmap' or signature is None:
+            return None
+        try:
+            return load_mapped_frame(self._mapped_path(name), signature)
+        except Exception as e:
+            print(f"Error loading mapped frame {name}: {e}")
+            return None
+
+    def _read_store(self, site_id, columns=None, filters=None):
+        """
+        Reads the site store, with the column selection and row filters pushed down into the reader.
+        """
+        path = self._parquet_path(site_id)
+        df = pd.read_parquet(path, columns=columns, filters=filters)
+        # Partitions come back in lexical order (Month=10 before Month=2), rows are sorted within each one
+        if 'Datetime' in df.columns and not df['Datetime'].is_monotonic_increasing:
+            df = df.sort_values('Datetime', kind='stable').reset_index(drop=True)
+        return enforce_schema(df)
+
+    def _write_store(self, site_id, df):
+        """
+        Writes the site store partitioned by year and month. The new dataset is written next to
+        the current one and swapped in, so that no stale partition survives a rebuild.
+        """
+        store_dir = self._store_dir(site_id)
+        tmp_dir, old_dir = f"{store_dir}.tmp", f"{store_dir}.old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        df.to_parquet(tmp_dir, partition_cols=PARTITION_COLUMNS)
+        write_signature(tmp_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.isdir(store_dir):
+            os.rename(store_dir, old_dir)
+        os.rename(tmp_dir, store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        legacy_path = f"{store_dir}.parquet"
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+    def _write_partitions(self, site_id, df, partitions):
+        """
+        Rewrites only some (Year, Month) partitions of the site store with their rows of df (the
+        merged site frame); the other partitions are left untouched. Each partition is written
+        next to the store and swapped in. Without partitions, the store and its signature are kept.
+        """
+        if not partitions:
+            return
+        store_dir = self._store_dir(site_id)
+        tmp_dir = f"{store_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        in_partitions = pd.MultiIndex.from_arrays([df['Year'], df['Month']]).isin(list(partitions))
+        df[in_partitions].to_parquet(tmp_dir, partition_cols=PARTITION_COLUMNS)
+        for year, month in sorted(partitions):
+            relative = os.path.join(f"Year={year}", f"Month={month}")
+            target, old_dir = os.path.join(store_dir, relative), os.path.join(tmp_dir, relative) + ".old"
+            if os.path.isdir(target):
+                os.rename(target, old_dir)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.rename(os.path.join(tmp_dir, relative), target)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        write_signature(store_dir)
+
+    def _cube_path(self, site_id):
+        return os.path.join(self._base_path, "data", "cube_store", f"{site_id}.parquet")
+
+    def cache_stats(self):
+        """
+        Hit / miss / eviction counters and memory usage of the site cache (and of the period cache).
+        """
+        return {**self._data_cache.stats(), 'periods': self._period_cache.stats()}
+
+    def set_cache_budget(self, max_mb):
+        """
+        Changes the memory budget of the site cache (MB); extra entries are evicted on the next insert.
+        """
+        self._data_cache.max_bytes = max_mb * 1024 * 1024
+
+    def invalidate(self, site_id=None):
+        """
+        Drops the cached frames of a site (of all sites if None).
+        """
+        predicate = None if site_id is None else (lambda key: key == site_id or (isinstance(key, tuple) and key[0] == site_id))
+        self._data_cache.invalidate(predicate)
+        self._period_cache.invalidate(predicate)
+
+    def _manifest_path(self, site_id):
+        return os.path.join(self._base_path, "data", "manifests", f"{site_id}.json")
+
+    def get_data(self, site_id, csv_source_path=None, workers=1, incremental=False):
+        """
+        Returns the processed frame of a site, from the Parquet store or rebuilt from the CSV exports.
+        When rebuilding, `workers` > 1 parses the CSV files in a process pool, and `incremental`
+        only ingests the files that are new or changed since the last build (see the site manifest).
+        """
+        parquet_path = self._parquet_path(site_id)
+        rebuild = bool(csv_source_path) or incremental
+        if not rebuild:
+            cached = self._data_cache.get(site_id, file_signature(parquet_path))
+            if cached is not None:
+                return cached
         
         sites = self.get_sites()
         site_info = next((s for s in sites if s['id'] == site_id), None)
@@ -42,21 +193,34 @@ class DataManager:
         # But for the app we want parquet.
         # Let's check parquet first unless valid csvs are forced.
         # Check if Parquet exists
-        parquet_path = os.path.join(self._base_path, "data", "parquet_store", f"{site_id}.parquet")
         
         # If csv_source_path is provided, we ASSUME we are in build/update mode or explicit override,
         # so we skip loading from parquet to ensure we read freshness from the source path.
-        if not csv_source_path and os.path.exists(parquet_path):
+        if not rebuild and os.path.exists(parquet_path):
             try:
-                print(f"Loading cached data for {site_id} from {parquet_path}...")
-                df = pd.read_parquet(parquet_path)
+                signature = file_signature(parquet_path)
+                df = self._load_shared_frame(site_id, signature)
+                if df is None:
+                    print(f"Loading cached data for {site_id} from {parquet_path}...")
+                    df = self._share_frame(site_id, self._read_store(site_id), signature)
                 if not df.empty:
+                    df = ensure_time_sorted(df)
                     self._attach_metadata(df, site_info)
-                    self._data_cache[site_id] = df
+                    self._data_cache.put(site_id, df, signature)
                     return df
             except Exception as e:
                 print(f"Error loading parquet for {site_id}: {e}")
             
+        return self._build_from_csv(site_info, csv_source_path, workers, incremental)
+
+    def _build_from_csv(self, site_info, csv_source_path=None, workers=1, incremental=False):
+        """
+        Parses the CSV exports of a site, writes the Parquet store, the directions metadata and the manifest.
+        In incremental mode, only new or changed files are parsed and merged into the existing store
+        (rows of files removed from the source folder are kept, a full build drops them).
+        """
+        site_id = site_info['id']
+        parquet_path = self._parquet_path(site_id)
         print(f"Loading CSV data for site: {site_id}...")
         
         base_search_path = csv_source_path if csv_source_path else self._base_path
@@ -68,29 +232,75 @@ class DataManager:
         if os.path.isdir(site_folder):
              print(f"Found dedicated folder for {site_id}: {site_folder}")
              pattern = os.path.join(site_folder, "*.csv")
-             files = glob.glob(pattern)
+             # Sorted so that the concatenation order (and the output) does not depend on the file system
+             files = sorted(glob.glob(pattern))
         
         if not files:
             print(f"No files found for site {site_id} in {base_search_path}")
             return pd.DataFrame()
-        type_site = site_info.get('type', None)
-        dfs = []
+
+        # Manifest: path (relative to the site folder) -> size, mtime and content hash of each ingested file
+        previous = self._load_manifest(site_id) if incremental else {}
+        manifest = {}
+        changed_files = []
         for file in files:
+            key = os.path.relpath(file, site_folder)
+            manifest[key] = _manifest_entry(file, previous.get(key))
+            if previous.get(key, {}).get('sha256') != manifest[key]['sha256']:
+                changed_files.append(file)
+
+        existing_df = pd.DataFrame()
+        if incremental and os.path.exists(parquet_path):
             try:
-                df = self._read_csv_robust(file, type_site)
-                if not df.empty:
-                    dfs.append(df)
+                existing_df = self._read_store(site_id)
             except Exception as e:
-                print(f"Error reading {file}: {e}")
+                print(f"Error loading parquet for {site_id}, full rebuild: {e}")
+                changed_files = files
+        else:
+            changed_files = files
+
+        if incremental:
+            print(f"Incremental build for {site_id}: {len(changed_files)} new or changed file(s) out of {len(files)}")
+        if not changed_files and not existing_df.empty:
+            self._save_manifest(site_id, manifest)
+            existing_df = ensure_time_sorted(existing_df)
+            self._attach_metadata(existing_df, site_info)
+            self._data_cache.put(site_id, existing_df, file_signature(parquet_path))
+            return existing_df
+
+        type_site = site_info.get('type', None)
+        if workers > 1 and len(changed_files) > 1:
+            # Results come back in submission order, keeping the concatenation deterministic
+            with ProcessPoolExecutor(max_workers=min(workers, len(changed_files))) as pool:
+                results = list(pool.map(_read_csv_file, changed_files, [type_site] * len(changed_files)))
+        else:
+            results = [_read_csv_file(file, type_site) for file in changed_files]
+        dfs = [df for df in results if not df.empty]
+        # Files that could not be parsed are left out of the manifest, so the next incremental build retries them
+        for file, df in zip(changed_files, results):
+            if df.empty:
+                print(f"No rows read from {file}, it will be retried on the next build")
+                manifest.pop(os.path.relpath(file, site_folder), None)
         
-        if not dfs:
+        if not dfs and existing_df.empty:
              return pd.DataFrame()
              
-        full_df = pd.concat(dfs, ignore_index=True)
-        if type_site == 'pedestre':
-            processed_df = full_df
+        if dfs:
+            full_df = pd.concat(dfs, ignore_index=True)
+            if type_site == 'pedestre':
+                processed_df = full_df
+            else:
+                processed_df = process_data(full_df)
+            processed_df = enforce_schema(processed_df, label=site_id)
         else:
-            processed_df = process_data(full_df)
+            processed_df = pd.DataFrame()
+
+        # (Year, Month) partitions receiving new rows: the only ones rewritten when merging into a partitioned store
+        touched = set(zip(processed_df['Year'].tolist(), processed_df['Month'].tolist())) if not processed_df.empty else set()
+        partial_write = not existing_df.empty and os.path.isdir(self._store_dir(site_id))
+
+        # Merge with the existing store; rows of a re-ingested file replace the stored ones
+        processed_df = merge_site_frames(existing_df, processed_df)
 
         # Check for extracted directions (Propagate from CSVs to metadata.json)
         extracted_dirs = None
@@ -118,18 +328,293 @@ class DataManager:
         # Save to Parquet
         if not processed_df.empty:
             try:
-                os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
-                print(f"Saving cache for {site_id} to {parquet_path}...")
-                processed_df.to_parquet(parquet_path)
+                os.makedirs(os.path.dirname(self._store_dir(site_id)), exist_ok=True)
+                if partial_write:
+                    print(f"Saving {len(touched)} partition(s) of {site_id} to {self._store_dir(site_id)}...")
+                    self._write_partitions(site_id, processed_df, touched)
+                else:
+                    print(f"Saving cache for {site_id} to {self._store_dir(site_id)}...")
+                    self._write_store(site_id, processed_df)
+                self._save_manifest(site_id, manifest)
             except Exception as e:
                  print(f"Error saving parquet for {site_id}: {e}")
         
         # Attach metadata to DF attrs
+        processed_df = ensure_time_sorted(processed_df)
         self._attach_metadata(processed_df, site_info)
         
-        self._data_cache[site_id] = processed_df
+        self._data_cache.put(site_id, processed_df, file_signature(self._parquet_path(site_id)))
         return processed_df
 
+    def query(self, site_id, start_date=None, end_date=None, columns=None, categories=None):
+        """
+        Rows of a site between two dates (end date included, as in filter_by_date), optionally
+        restricted to some columns and UnifiedCategory values. The filters are pushed down into
+        the Parquet reader: only the Year/Month partitions of the range are opened.
+        Served from memory when the whole site frame is already cached (or mapped, see FRAME_BACKEND).
+        The dashboards read whole-site aggregates built once per store version (cube, daily totals...)
+        and call it without a date range: the range filters serve one-off reads (scripts, analyses).
+        """
+        signature = file_signature(self._parquet_path(site_id))
+        cache_key = (site_id, 'query', start_date, end_date,
+                     tuple(columns) if columns else None, tuple(categories) if categories is not None else None)
+        cached = self._data_cache.get(cache_key, signature)
+        if cached is not None:
+            return cached
+
+        site_info = next((s for s in self.get_sites() if s['id'] == site_id), None)
+        if not site_info:
+            print(f"Site {site_id} not found.")
+            return pd.DataFrame()
+
+        df = None
+        # With the mmap backend, slicing the shared site frame beats private partition reads
+        if signature is not None and site_id not in self._data_cache and FRAME_BACKEND != 'mmap':
+            try:
+                df = self._read_store(site_id, columns, _store_filters(start_date, end_date, categories))
+            except Exception as e:
+                print(f"Error querying parquet for {site_id}: {e}")
+        if df is None:
+            df = _filter_frame(self.get_data(site_id), start_date, end_date, columns, categories)
+            # The site may just have been built from the CSV exports
+            signature = file_signature(self._parquet_path(site_id))
+
+        df = ensure_time_sorted(df)
+        self._attach_metadata(df, site_info)
+        self._data_cache.put(cache_key, df, signature)
+        return df
+
+    def _load_manifest(self, site_id):
+        manifest_path = self._manifest_path(site_id)
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('files', {})
+            except Exception as e:
+                print(f"Error loading manifest for {site_id}: {e}")
+        return {}
+
+    def _save_manifest(self, site_id, files):
+        manifest_path = self._manifest_path(site_id)
+        try:
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump({'site_id': site_id, 'files': files}, f, indent=4, ensure_ascii=False)
+        except Exception as e:
+            print(f"Error saving manifest for {site_id}: {e}")
+
+    def get_cube(self, site_id):
+        """
+        Returns the hourly cube of a road site (see build_hourly_cube).
+        Read from data/cube_store, or built from the site data when the store has no cube yet.
+        """
+        cache_key = (site_id, 'hourly')
+        cube_signature, raw_signature = self._cube_signature(site_id)
+        cached = self._data_cache.get(cache_key, (cube_signature, raw_signature))
+        if cached is not None:
+            return cached
+
+        site_info = next((s for s in self.get_sites() if s['id'] == site_id), None)
+        if not site_info:
+            print(f"Site {site_id} not found.")
+            return pd.DataFrame()
+
+        # A cube older than the raw store is stale (raw data rebuilt without its cube)
+        is_stale = cube_signature and raw_signature and cube_signature[0] < raw_signature[0]
+        if cube_signature and not is_stale:
+            try:
+                signature = (cube_signature, raw_signature)
+                cube = self._load_shared_frame(f"{site_id}.hourly", signature)
+                if cube is None:
+                    cube = pd.read_parquet(self._cube_path(site_id))
+                    # Cubes written before public holidays were counted as WE
+                    cube['DayType'] = day_types(cube['Date'])
+                    cube = self._share_frame(f"{site_id}.hourly", enforce_schema(cube), signature)
+                if not cube.empty:
+                    cube = ensure_time_sorted(cube)
+                    self._attach_metadata(cube, site_info)
+                    self._data_cache.put(cache_key, cube, signature)
+                    return cube
+            except Exception as e:
+                print(f"Error loading cube for {site_id}: {e}")
+
+        df = self.get_data(site_id)
+        if df.empty:
+            return pd.DataFrame()
+        return self.save_cube(site_id, df)
+
+    def save_cube(self, site_id, df):
+        """
+        Builds the hourly cube from the site data, writes it to data/cube_store and caches it.
+        """
+        cube = enforce_schema(build_hourly_cube(df))
+        if cube.empty:
+            return cube
+        cube_path = self._cube_path(site_id)
+        try:
+            os.makedirs(os.path.dirname(cube_path), exist_ok=True)
+            print(f"Saving hourly cube for {site_id} to {cube_path} ({len(cube)} rows)...")
+            cube.to_parquet(cube_path)
+        except Exception as e:
+            print(f"Error saving cube for {site_id}: {e}")
+        cube = ensure_time_sorted(cube)
+        cube.attrs['metadata'] = df.attrs.get('metadata', {})
+        self._data_cache.put((site_id, 'hourly'), cube, self._cube_signature(site_id))
+        return cube
+
+    def _cube_signature(self, site_id):
+        return (file_signature(self._cube_path(site_id)), file_signature(self._parquet_path(site_id)))
+
+    def cube_is_current(self, site_id):
+        """
+        True if the hourly cube of the site was written after the last write of its raw store.
+        """
+        cube_signature, raw_signature = self._cube_signature(site_id)
+        return bool(cube_signature and raw_signature and cube_signature[0] >= raw_signature[0])
+
+    def data_signature(self, site_id):
+        """
+        Signature of the stores of a site (hourly cube and raw data), changes when they are rebuilt.
+        """
+        return self._cube_signature(site_id)
+
+    def get_daily(self, site_id):
+        """
+        Daily aggregate of a road site (see build_daily_aggregate), derived from the hourly cube
+        and cached with it. Serves the daily and monthly resolutions of the timeline.
+        """
+        cache_key = (site_id, 'daily')
+        cached = self._data_cache.get(cache_key, self._cube_signature(site_id))
+        if cached is not None:
+            return cached
+        cube = self.get_cube(site_id)
+        if cube.empty:
+            return cube
+        daily = ensure_time_sorted(build_daily_aggregate(cube))
+        daily.attrs['metadata'] = cube.attrs.get('metadata', {})
+        return self._data_cache.put(cache_key, daily, self._cube_signature(site_id))
+
+    def get_daily_totals(self, site_id):
+        """
+        Daily totals of a site (see build_daily_totals), built once per store version: the
+        pedestrian synthesis indicators are served by slicing it. The returned frame must not be modified.
+        """
+        cache_key = (site_id, 'daily_totals')
+        cached = self._data_cache.get(cache_key, file_signature(self._parquet_path(site_id)))
+        if cached is not None:
+            return cached
+        df = self.query(site_id, columns=['Datetime', 'Count'])
+        if df.empty:
+            return pd.DataFrame()
+        daily = build_daily_totals(df)
+        daily.attrs['metadata'] = df.attrs.get('metadata', {})
+        # Signature taken after query, which may just have built the store
+        return self._data_cache.put(cache_key, daily, file_signature(self._parquet_path(site_id)))
+
+    def get_annual_profiles(self, site_id):
+        """
+        Year x day-of-year daily counts of a site, raw and smoothed (see build_annual_profiles),
+        derived from the daily totals and cached until the store is rebuilt.
+        """
+        cache_key = (site_id, 'annual_profiles')
+        cached = self._data_cache.get(cache_key, file_signature(self._parquet_path(site_id)))
+        if cached is not None:
+            return cached
+        daily = self.get_daily_totals(site_id)
+        if daily.empty:
+            return None
+        return self._data_cache.put(cache_key, build_annual_profiles(daily), file_signature(self._parquet_path(site_id)))
+
+    def get_timeline_pyramid(self, site_id):
+        """
+        Hourly and daily levels of the pedestrian timeline (see build_timeline_pyramid), built once
+        and cached until the store is rebuilt: a zoom only slices the visible window of a level.
+        """
+        cache_key = (site_id, 'timeline_pyramid')
+        cached = self._data_cache.get(cache_key, file_signature(self._parquet_path(site_id)))
+        if cached is not None:
+            return cached
+        df = self.query(site_id, columns=['Datetime', 'Count'])
+        if df.empty:
+            return None
+        return self._data_cache.put(cache_key, build_timeline_pyramid(df), file_signature(self._parquet_path(site_id)))
+
+    def get_hourly_profiles(self, site_id):
+        """
+        Per-day hourly vectors of a site with per-weekday prefix sums (see build_hourly_profiles),
+        built once and cached until the store is rebuilt: the pedestrian heatmap of any period /
+        season is derived from them without reading the hourly rows.
+        """
+        cache_key = (site_id, 'hourly_profiles')
+        cached = self._data_cache.get(cache_key, file_signature(self._parquet_path(site_id)))
+        if cached is not None:
+            return cached
+        df = self.query(site_id, columns=['Datetime', 'Count'])
+        if df.empty:
+            return None
+        return self._data_cache.put(cache_key, build_hourly_profiles(df), file_signature(self._parquet_path(site_id)))
+
+    def get_comparison(self, site_id, cats):
+        """
+        Yearly (Year, UnifiedCategory, Volume, NbDays, TMJ) and monthly (Year, Month, Volume, NbDays,
+        TMJ_Month) comparison tables of a road site for a set of categories.
+        Derived in milliseconds from per-site tables (see build_comparison_tables) computed once per
+        cube version; cached per category set. The returned frames must not be modified.
+        """
+        signature = self._cube_signature(site_id)
+        cache_key = (site_id, 'comparison', tuple(sorted(set(cats or []))))
+        cached = self._data_cache.get(cache_key, signature)
+        if cached is not None:
+            return cached
+
+        tables_key = (site_id, 'comparison_tables')
+        tables = self._data_cache.get(tables_key, signature)
+        if tables is None:
+            daily = self.get_daily(site_id)
+            if daily.empty:
+                return pd.DataFrame(), pd.DataFrame()
+            tables = self._data_cache.put(tables_key, build_comparison_tables(daily), self._cube_signature(site_id))
+        result = comparison_for_categories(tables, cats or [])
+        return self._data_cache.put(cache_key, result, self._cube_signature(site_id))
+
+    def get_calendar(self, site_id):
+        """
+        Calendar of a road site (see calendar_table) from the first to the last day of its hourly cube,
+        cached with the cube: seasonal periods slice it instead of building their own.
+        """
+        cache_key = (site_id, 'calendar')
+        cached = self._data_cache.get(cache_key, self._cube_signature(site_id))
+        if cached is not None:
+            return cached
+        cube = self.get_cube(site_id)
+        if cube.empty:
+            return None
+        days = cube['Date']
+        return self._data_cache.put(cache_key, calendar_table(days.min(), days.max()), self._cube_signature(site_id))
+
+    def get_period(self, site_id, start_date, end_date, season=None, level='hourly'):
+        """
+        Hourly cube (or daily aggregate, level='daily') of a road site restricted to a date range
+        (filter_by_date) and optionally to a season, given as (start_month, start_day, end_month,
+        end_day) (filter_by_season).
+        Returns (period_df, theoretical_days), theoretical_days being None without season.
+        Memoized with a TTL so that sibling callbacks and repeat visits share the result:
+        the returned frame must not be modified.
+        """
+        season = tuple(int(v) for v in season) if season else None
+        cache_key = (site_id, start_date, end_date, season, level)
+        cached = self._period_cache.get(cache_key, self._cube_signature(site_id))
+        if cached is not None:
+            return cached
+
+        frame = self.get_daily(site_id) if level == 'daily' else self.get_cube(site_id)
+        period_df = filter_by_date(frame, start_date, end_date)
+        theoretical_days = None
+        if season:
+            period_df, theoretical_days = filter_by_season(period_df, *season, calendar=self.get_calendar(site_id))
+        # Signature taken after get_cube, which may just have written the cube
+        return self._period_cache.put(cache_key, (period_df, theoretical_days), self._cube_signature(site_id))
+
     def _attach_metadata(self, df, site_info):
         # Default directions
         d1 = 'Sens 1'
@@ -166,14 +651,15 @@ class DataManager:
             raise Exception(f"Unknown site type: {type}, for file: {file}")
 
     def _parse_routier_csv(self, file):
-        try:  
-            df = pd.read_csv(file, sep=';', encoding='latin1', on_bad_lines='skip', low_memory=False)
+        # 1. Sniff the header only, to resolve the needed columns
+        try:
+            header = pd.read_csv(file, sep=';', encoding='latin1', nrows=0).columns
         except:
             return pd.DataFrame()
         
         # Extract Directions from Header
         extracted_directions = None
-        for col in df.columns:
+        for col in header:
             if "direction_1_2" in col.lower():
                 # Expected format: ... direction_1_2 (1: vers col de la Bonette) (2: vers Jausiers)
                 match = re.search(r"\(1:\s*(.*?)\)\s*\(2:\s*(.*?)\)", col)
@@ -182,37 +668,34 @@ class DataManager:
                     break
         
         # Identify relevant columns dynamically
-        found_cols = _identify_columns(df.columns)
-        
-        # Select and Rename
-        selected_data = {
-            new_name: df[orig_col] 
-            for orig_col, new_name in found_cols.items()
-        }
+        found_cols = _identify_columns(header)
         
-        if 'Datetime' not in selected_data:
+        if 'Datetime' not in found_cols.values():
              return pd.DataFrame()
              
-        new_df = pd.DataFrame(selected_data)
+        # 2. Read only those columns, with explicit types
+        new_df = _read_columns(file, found_cols)
+        if new_df.empty:
+            return new_df
         
         if extracted_directions:
             new_df.attrs['extracted_directions'] = extracted_directions
 
-        # Parse Datetime with mixed format support
-        new_df['Datetime'] = pd.to_datetime(new_df['Datetime'], format='mixed').dt.tz_convert(TZ)
+        # Parse Datetime (format detected per file, the pyarrow engine may already have parsed it)
+        new_df['Datetime'] = parse_timestamps(new_df['Datetime'], file)
+        new_df.dropna(subset=['Datetime'], inplace=True)
         
         # Clean numeric columns
         if 'Speed' in new_df.columns:
-            if new_df['Speed'].dtype == 'object':
+            if not pd.api.types.is_numeric_dtype(new_df['Speed']):
                 new_df['Speed'] = new_df['Speed'].str.replace(',', '.', regex=False)
             new_df['Speed'] = pd.to_numeric(new_df['Speed'], errors='coerce')
+        for col in ('Category_Sterela', 'Category_SIREDO'):
+            if col in new_df.columns and not pd.api.types.is_numeric_dtype(new_df[col]):
+                new_df[col] = pd.to_numeric(new_df[col], errors='coerce')
         
         # Extract Temporal Features
-        new_df['Date'] = new_df['Datetime'].dt.date
-        new_df['Hour'] = new_df['Datetime'].dt.hour
-        new_df['Month'] = new_df['Datetime'].dt.month
-        new_df['Year'] = new_df['Datetime'].dt.year
-        new_df['Weekday'] = new_df['Datetime'].dt.day_name()
+        _add_temporal_features(new_df)
         
         return new_df
 
@@ -225,34 +708,404 @@ class DataManager:
             df['Count'] = pd.to_numeric(df['Count'], errors='coerce')
             
             # Parse Datetime
-            # Format in CSV: 2018-06-14 00:00:00
-            df['Datetime'] = pd.to_datetime(df['Datetime'], format='mixed', errors='coerce')
+            # Format in CSV: 2018-06-14 00:00:00, assumed to be local time
+            # Ambiguous hours (DST change) cannot be placed in time and are dropped with the unparsable rows
+            df['Datetime'] = parse_timestamps(df['Datetime'], file)
             df.dropna(subset=['Datetime'], inplace=True)
             
-            # Localize
-            # Assuming data is in local time, we localize to TZ. If already tz-aware, we convert to TZ.
-            if df['Datetime'].dt.tz is None:
-                df['Datetime'] = df['Datetime'].dt.tz_localize(TZ, ambiguous='NaT', nonexistent='shift_forward')
-            else:
-                df['Datetime'] = df['Datetime'].dt.tz_convert(TZ)
-            
             # Fill standard columns used by dashboard
             df['UnifiedCategory'] = "Piétons"
             df['Direction'] = "Global"
             df['Speed'] = np.nan
             
             # Extract Temporal Features
-            df['Date'] = df['Datetime'].dt.date
-            df['Hour'] = df['Datetime'].dt.hour
-            df['Month'] = df['Datetime'].dt.month
-            df['Year'] = df['Datetime'].dt.year
-            df['Weekday'] = df['Datetime'].dt.day_name()
+            _add_temporal_features(df)
             
             return df
         except Exception as e:
             print(f"Error parsing pedestrian CSV {file}: {e}")
             return pd.DataFrame()
 
+def ensure_time_sorted(df):
+    """
+    Sorts a frame served by DataManager by Datetime if needed (stable, row order of equal
+    timestamps kept), so that filter_by_date can slice it by binary search. The frames are
+    sorted once, when loaded or built.
+    """
+    if 'Datetime' not in df.columns:
+        return df
+    if not df['Datetime'].is_monotonic_increasing:
+        df = df.sort_values('Datetime', kind='stable').reset_index(drop=True)
+    return df
+
+def _store_filters(start_date, end_date, categories=None):
+    """
+    Parquet filters (disjunctive normal form) selecting a date range and some categories.
+    The range is split per month so that the Year/Month partitions outside of it are pruned.
+    """
+    clauses = []
+    bounds = local_day_bounds(start_date, end_date)
+    if bounds:
+        start, end = bounds
+        in_range = [('Datetime', '>=', start), ('Datetime', '<', end)]
+        months = pd.period_range(start.tz_localize(None), (end - pd.Timedelta(1)).tz_localize(None), freq='M')
+        clauses = [[('Year', '=', p.year), ('Month', '=', p.month)] + in_range for p in months]
+    if categories is not None:
+        in_categories = ('UnifiedCategory', 'in', list(categories))
+        clauses = [clause + [in_categories] for clause in clauses] or [[in_categories]]
+    return clauses or None
+
+def _filter_frame(df, start_date=None, end_date=None, columns=None, categories=None):
+    """
+    In-memory equivalent of the filters of DataManager.query.
+    """
+    if df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    bounds = local_day_bounds(start_date, end_date)
+    if bounds:
+        mask &= (df['Datetime'] >= bounds[0]) & (df['Datetime'] < bounds[1])
+    if categories is not None:
+        mask &= df['UnifiedCategory'].isin(categories)
+    return df.loc[mask, columns if columns else df.columns].reset_index(drop=True)
+
+def _manifest_entry(file, previous=None):
+    """
+    Size, mtime and SHA-256 of a CSV export. The hash is reused from the previous
+    manifest entry when size and mtime did not change.
+    """
+    st = os.stat(file)
+    entry = {'path': file, 'size': st.st_size, 'mtime': st.st_mtime}
+    if previous and previous.get('size') == st.st_size and previous.get('mtime') == st.st_mtime:
+        entry['sha256'] = previous.get('sha256')
+    else:
+        sha = hashlib.sha256()
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        entry['sha256'] = sha.hexdigest()
+    return entry
+
+# Key of a passage (road) or of a count interval (pedestrian), used when merging new exports into the store
+DEDUP_COLUMNS = ['Datetime', 'Lane', 'Direction']
+
+def merge_site_frames(existing_df, new_df):
+    """
+    Appends newly parsed rows to the stored site frame and sorts by time. Stored rows sharing
+    their DEDUP_COLUMNS key with a new row are replaced (re-ingested or overlapping exports).
+    Rows of the same batch are not de-duplicated against each other.
+    """
+    if existing_df.empty:
+        merged = new_df
+    elif new_df.empty:
+        return existing_df
+    else:
+        subset = [c for c in DEDUP_COLUMNS if c in existing_df.columns and c in new_df.columns]
+        existing_keys = pd.MultiIndex.from_frame(existing_df[subset])
+        new_keys = pd.MultiIndex.from_frame(new_df[subset])
+        replaced = existing_keys.isin(new_keys)
+        if replaced.any():
+            print(f"Replacing {replaced.sum()} stored rows with re-ingested ones")
+        merged = pd.concat([existing_df[~replaced], new_df], ignore_index=True)
+    if merged.empty:
+        return merged
+    merged = merged.sort_values('Datetime', kind='stable').reset_index(drop=True)
+    # Concatenated categoricals with different categories fall back to object
+    return enforce_schema(merged)
+
+def _read_csv_file(file, type_site):
+    """
+    Parses one CSV export. Module-level so that it can run in a worker process.
+    """
+    try:
+        return DataManager()._read_csv_robust(file, type_site)
+    except Exception as e:
+        print(f"Error reading {file}: {e}")
+        return pd.DataFrame()
+
+# Candidate timestamp formats, tried on a sample of each file. 'ISO8601' covers the
+# Sterela exports (with or without fractional seconds / offset) and the pedestrian ones.
+DATETIME_FORMATS = ['ISO8601', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y']
+DATETIME_SAMPLE_SIZE = 1000
+_TZ_SUFFIX = r'(?:Z|[+-]\d{2}:?\d{2})$'
+_OFFSET_SUFFIX = r'[+-]\d{2}:\d{2}$'
+
+def parse_timestamps(values, source=''):
+    """
+    Parses a column of timestamps and returns it in local time (TZ).
+    The format is detected on a sample of rows and the whole column is parsed with it in a
+    single vectorized pass; only the rows that fail go through the slow mixed-format parser.
+    Unparsable rows become NaT. Naive timestamps are assumed to be local time.
+    """
+    name = os.path.basename(source) if source else 'timestamps'
+    if pd.api.types.is_datetime64_any_dtype(values):
+        print(f"{name}: timestamps already parsed by the CSV engine")
+        return _to_local_time(values)
+
+    present = values.dropna()
+    if present.empty:
+        return _to_local_time(pd.to_datetime(values, errors='coerce'))
+    positions = np.linspace(0, len(present) - 1, min(DATETIME_SAMPLE_SIZE, len(present))).astype(int)
+    sample = present.iloc[positions].astype(str)
+    # Offsets differ across DST changes, tz-aware columns are parsed in UTC
+    is_aware = sample.str.contains(_TZ_SUFFIX).mean() > 0.5
+
+    best_format, best_count = None, 0
+    for fmt in DATETIME_FORMATS:
+        count = pd.to_datetime(sample, format=fmt, errors='coerce', utc=is_aware).notna().sum()
+        if count > best_count:
+            best_format, best_count = fmt, count
+        if count == len(sample):
+            break
+
+    if best_format == 'ISO8601' and is_aware and sample.str.contains(_OFFSET_SUFFIX).all():
+        # pandas builds one tzinfo per distinct offset string, which is slow: apply the offsets ourselves
+        best_format = 'ISO8601 + offset'
+        parsed = _parse_with_offsets(values)
+        failed = parsed.isna() & values.notna()
+    elif best_format is None:
+        failed = values.notna()
+        parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns, UTC]' if is_aware else 'datetime64[ns]')
+    else:
+        parsed = pd.to_datetime(values, format=best_format, errors='coerce', utc=is_aware)
+        failed = parsed.isna() & values.notna()
+    nb_fallback = int(failed.sum())
+    if nb_fallback:
+        try:
+            fallback = pd.to_datetime(values[failed], format='mixed', errors='coerce', utc=is_aware)
+            parsed = parsed.where(~failed, fallback.reindex(parsed.index))
+        except (ValueError, TypeError) as e:
+            print(f"{name}: mixed-format fallback failed ({e})")
+    nb_invalid = int((parsed.isna() & values.notna()).sum())
+    print(f"{name}: datetime format '{best_format or 'mixed'}', {nb_fallback} row(s) sent to the mixed parser, {nb_invalid} unparsable")
+    return _to_local_time(parsed)
+
+def _parse_with_offsets(values):
+    """
+    Parses ISO timestamps ending with a '+HH:MM' offset into UTC. Rows with another suffix become NaT.
+    """
+    text = values.astype(str)
+    offset = text.str[-6:]
+    sign = offset.str[0].map({'+': 1, '-': -1})
+    minutes = pd.to_numeric(offset.str[1:3], errors='coerce') * 60 + pd.to_numeric(offset.str[4:6], errors='coerce')
+    minutes = minutes.where(offset.str[3] == ':') * sign
+    local = pd.to_datetime(text.str[:-6], format='ISO8601', errors='coerce')
+    return (local - pd.to_timedelta(minutes, unit='min')).dt.tz_localize('UTC')
+
+def _to_local_time(datetimes):
+    """
+    Localizes naive datetimes to TZ (ambiguous DST hours become NaT) or converts tz-aware ones.
+    """
+    if datetimes.dt.tz is None:
+        return datetimes.dt.tz_localize(TZ, ambiguous='NaT', nonexistent='shift_forward')
+    return datetimes.dt.tz_convert(TZ)
+
+def build_daily_aggregate(cube):
+    """
+    Daily totals of the hourly cube per Direction / UnifiedCategory (Count, SpeedSum, SpeedCount),
+    with the calendar columns. Datetime is the local midnight of each day.
+    """
+    keys = [cube['Date'], cube['Direction'], cube['UnifiedCategory']]
+    daily = cube.groupby(keys, observed=True, dropna=False)[['Count', 'SpeedSum', 'SpeedCount']].sum().reset_index()
+    # Local midnight always exists in Europe/Paris (DST changes happen at night)
+    daily['Datetime'] = daily['Date'].dt.tz_localize(TZ)
+    _add_temporal_features(daily)
+    _add_day_features(daily)
+    return enforce_schema(daily)
+
+def build_daily_totals(df):
+    """
+    Count per local day of a site, indexed by the day (datetime64), with the Weekday code
+    (Monday = 0), the IsWE flag and the MonthDay key of filter_by_season.
+    Days whose records are all missing count 0, days without any record are absent.
+    """
+    days = df['Datetime'].dt.tz_localize(None).dt.normalize().to_numpy()
+    counts = df['Count'].groupby(days).sum()
+    index = pd.DatetimeIndex(counts.index, name='Date')
+    weekday = index.dayofweek.to_numpy().astype('int8')
+    return pd.DataFrame({
+        'Count': counts.to_numpy(dtype=float),
+        'Weekday': weekday,
+        'IsWE': weekday >= 5,
+        'MonthDay': month_day(index).to_numpy().astype('int16'),
+    }, index=index)
+
+def build_timeline_pyramid(df):
+    """
+    Count summed per hour ('H') and per local day ('D') over a regular index from the first to
+    the last record, NaN where there is no record (as the timeline resampling did). Months are
+    resampled from a slice of the daily level, a few thousand values at most.
+    """
+    counts = df.set_index('Datetime')['Count']
+    return {'H': counts.resample('h').sum(min_count=1), 'D': counts.resample('D').sum(min_count=1)}
+
+def build_hourly_profiles(df):
+    """
+    24-slot vectors of each day of a regular calendar (first to last local day of the records),
+    accumulated per weekday: {'days': DatetimeIndex, 'weekdays': weekday code of each day (Monday = 0),
+    'sums' / 'counts': 7 prefix-sum arrays, one per weekday, of shape (days of that weekday + 1, 24),
+    of the Count total / number of non-missing records of each local hour}. Rows i..j of the days of a
+    weekday add up as prefix[j] - prefix[i] (see hourly_profile_window).
+    """
+    local = df['Datetime'].dt.tz_localize(None)
+    day = local.dt.normalize()
+    days = pd.date_range(day.min(), day.max(), freq='D')
+    position = (day - days[0]).dt.days.to_numpy()
+    values = df['Count'].to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    cells = (position * 24 + local.dt.hour.to_numpy())[valid]
+    shape = (len(days), 24)
+    sums = np.bincount(cells, weights=values[valid], minlength=np.prod(shape)).reshape(shape)
+    counts = np.bincount(cells, minlength=np.prod(shape)).reshape(shape)
+    weekdays = days.dayofweek.to_numpy().astype('int8')
+
+    def prefix(vectors, weekday):
+        rows = vectors[weekdays == weekday]
+        return np.concatenate([np.zeros((1, 24), dtype=rows.dtype), np.cumsum(rows, axis=0)])
+
+    return {
+        'days': days,
+        'weekdays': weekdays,
+        'sums': [prefix(sums, w) for w in range(7)],
+        'counts': [prefix(counts, w) for w in range(7)],
+    }
+
+def hourly_profile_window(profiles, selected):
+    """
+    7 x 24 (Monday first) Count totals and numbers of records of the days selected by a boolean
+    mask over profiles['days'] (see build_hourly_profiles): two gathers per run of selected days.
+    """
+    sums = np.zeros((7, 24))
+    counts = np.zeros((7, 24), dtype=np.int64)
+    for weekday in range(7):
+        on_weekday = selected[profiles['weekdays'] == weekday]
+        sums[weekday] = prefix_window_sum(profiles['sums'][weekday], on_weekday)
+        counts[weekday] = prefix_window_sum(profiles['counts'][weekday], on_weekday)
+    return sums, counts
+
+# Width (days) of the rolling mean smoothing the yearly profiles
+PROFILE_SMOOTHING_DAYS = 7
+
+def build_annual_profiles(daily):
+    """
+    Daily totals (build_daily_totals) laid out as a years x 366 matrix (column = day of year - 1):
+    {'years': int array, 'counts': matrix, NaN for days without data, 'smooth': centered
+    PROFILE_SMOOTHING_DAYS-day mean of each year over its days with data}.
+    """
+    index = daily.index
+    years, year_pos = np.unique(index.year.to_numpy(), return_inverse=True)
+    counts = np.full((len(years), 366), np.nan)
+    counts[year_pos, index.dayofyear.to_numpy() - 1] = daily['Count'].to_numpy()
+    return {'years': years, 'counts': counts, 'smooth': centered_rolling_mean(counts, PROFILE_SMOOTHING_DAYS)}
+
+def build_comparison_tables(daily):
+    """
+    Per-site tables of the annual comparison, from the daily aggregate: yearly and monthly volumes
+    per category, and active-day counts. A day is active for a set of categories if any of them
+    was counted that day, so days are counted per bitmask of the categories present: the active
+    days of any set are the sum over the masks intersecting it.
+    """
+    per_day = daily.groupby(['Date', 'Year', 'Month', 'UnifiedCategory'], observed=True)['Count'].sum().reset_index()
+    categories = list(per_day['UnifiedCategory'].cat.categories)
+    # One row per (day, category): summing the bits gives the mask of the categories of the day
+    per_day['Mask'] = np.left_shift(1, per_day['UnifiedCategory'].cat.codes.to_numpy(dtype=np.int64))
+    day_masks = per_day.groupby(['Date', 'Year', 'Month'])['Mask'].sum().reset_index()
+    return {
+        'categories': categories,
+        'annual': per_day.groupby(['Year', 'UnifiedCategory'], observed=True)['Count'].sum().reset_index(name='Volume'),
+        'monthly': per_day.groupby(['Year', 'Month', 'UnifiedCategory'], observed=True)['Count'].sum().reset_index(name='Volume'),
+        'annual_days': day_masks.groupby(['Year', 'Mask']).size().reset_index(name='NbDays'),
+        'monthly_days': day_masks.groupby(['Year', 'Month', 'Mask']).size().reset_index(name='NbDays'),
+    }
+
+def comparison_for_categories(tables, cats):
+    """
+    Yearly and monthly volumes, active days and TMJ of a set of categories (see build_comparison_tables).
+    """
+    selected = [c for c in tables['categories'] if c in set(cats)]
+    if not selected:
+        return pd.DataFrame(), pd.DataFrame()
+    mask = sum(1 << tables['categories'].index(c) for c in selected)
+
+    annual_vols = tables['annual'][tables['annual']['UnifiedCategory'].isin(selected)]
+    annual_days = tables['annual_days']
+    days_per_year = annual_days[(annual_days['Mask'] & mask) != 0].groupby('Year')['NbDays'].sum().reset_index()
+    annual_group = pd.merge(annual_vols, days_per_year, on='Year')
+    annual_group['TMJ'] = (annual_group['Volume'] / annual_group['NbDays']).round(0)
+
+    monthly = tables['monthly']
+    monthly_vols = monthly[monthly['UnifiedCategory'].isin(selected)].groupby(['Year', 'Month'])['Volume'].sum().reset_index()
+    monthly_days = tables['monthly_days']
+    days_per_month = monthly_days[(monthly_days['Mask'] & mask) != 0].groupby(['Year', 'Month'])['NbDays'].sum().reset_index()
+    monthly_group = pd.merge(monthly_vols, days_per_month, on=['Year', 'Month'])
+    monthly_group['TMJ_Month'] = (monthly_group['Volume'] / monthly_group['NbDays']).round(0)
+    return annual_group, monthly_group
+
+def _add_temporal_features(df):
+    """
+    Adds the calendar columns derived from Datetime (in place).
+    Date is the local day as a datetime64 (midnight, naive), MonthDay the month * 100 + day key
+    used by the seasonal filter.
+    """
+    df['Date'] = df['Datetime'].dt.tz_localize(None).dt.normalize()
+    df['Hour'] = df['Datetime'].dt.hour
+    df['Month'] = df['Datetime'].dt.month
+    df['Year'] = df['Datetime'].dt.year
+    df['MonthDay'] = df['Month'] * 100 + df['Datetime'].dt.day
+    df['Weekday'] = df['Datetime'].dt.day_name()
+
+def _add_day_features(df):
+    """
+    Adds the French weekday name and the DayType (JO vs WE, public holidays with the weekends,
+    see day_types) columns (in place).
+    """
+    df['Weekday_FR'] = df['Weekday'].map(FRENCH_DAYS)
+    df['DayType'] = day_types(df['Date'])
+
+# Types of the road export columns for the column-pruned reader.
+# Datetime is not listed: the pyarrow engine parses ISO timestamps natively.
+ROUTIER_DTYPES = {
+    'Lane': 'category',
+    'Direction': 'category',
+    'Category': 'category',
+    'Category_Sterela': 'float64',
+    'Category_SIREDO': 'float64',
+    'Speed': str,  # decimal comma, converted after reading
+}
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINES = ['pyarrow', 'c']
+except ImportError:
+    CSV_ENGINES = ['c']
+
+def _read_columns(file, found_cols, engines=CSV_ENGINES):
+    """
+    Reads only the identified columns of a road export (original name -> standard name),
+    with the pyarrow engine when available. Falls back to a full read of the file
+    followed by the column selection.
+    """
+    usecols = list(found_cols)
+    dtypes = {orig: ROUTIER_DTYPES[new] for orig, new in found_cols.items() if new in ROUTIER_DTYPES}
+    for engine in engines:
+        try:
+            df = pd.read_csv(file, sep=';', encoding='latin1', on_bad_lines='skip',
+                             usecols=usecols, dtype=dtypes, engine=engine)
+            return df[usecols].rename(columns=found_cols)
+        except Exception as e:
+            print(f"{engine} CSV reader failed on {file} ({e}), trying fallback...")
+    return _read_all_columns(file, found_cols)
+
+def _read_all_columns(file, found_cols):
+    """
+    Previous reader: every column as inferred by the C engine, then the column selection.
+    """
+    try:
+        df = pd.read_csv(file, sep=';', encoding='latin1', on_bad_lines='skip', low_memory=False)
+    except:
+        return pd.DataFrame()
+    return pd.DataFrame({new_name: df[orig_col] for orig_col, new_name in found_cols.items()})
+
 def _identify_columns(columns):
     """
     Helper to map CSV columns to standard names based on substrings.
@@ -268,30 +1121,86 @@ def _identify_columns(columns):
             found_cols[col] = 'Direction'
         elif 'categorysterela_label' in c_lower:
             found_cols[col] = 'Category'
+        elif 'categorysterela' in c_lower:
+            found_cols[col] = 'Category_Sterela'
         elif 'category1' in c_lower:
             found_cols[col] = 'Category_SIREDO'
         elif c_lower.startswith('speed') and 'average' not in c_lower and 'validity' not in c_lower and 'delta' not in c_lower:
             found_cols[col] = 'Speed'
     return found_cols
 
-def _get_unified_category(row):
+# Category unification rules, evaluated in order (first match wins, otherwise 'Autre').
+# Each rule is (UnifiedCategory, kind, values) where kind is one of:
+#   - 'label_contains'       : the lower-cased Sterela label contains one of the values
+#   - 'label_equals'         : the lower-cased Sterela label is one of the values
+#   - 'siredo'               : the SIREDO code (category1) is one of the values
+#   - 'label_without_siredo' : label equals one of the values and no SIREDO code is present
+CATEGORY_RULES = [
+    # Robust check for 'Vélo' including potential encoding artifacts (Vï¿½lo, etc)
+    ('Vélos', 'label_contains', ['vélo', 'velo', 'vï¿½lo', 'vlo']),
+    ('Motos', 'label_equals', ['moto']),
+    ('VL', 'siredo', [1, 12]),
+    ('VL', 'label_without_siredo', ['u3']),
+    ('PL', 'siredo', [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 14]),
+]
+
+# Sterela category number -> UnifiedCategory. When the export provides the number
+# (Category_Sterela column), mapped numbers take precedence over CATEGORY_RULES.
+# Deliberately left empty: the Sterela numbering is not documented in our exports, so the
+# labels and SIREDO codes of CATEGORY_RULES stay the reference until it is confirmed per site.
+STERELA_CATEGORY_MAP = {}
+
+def unify_categories(df, rules=None, sterela_map=None):
     """
-    Maps raw categories to [Vélos, Motos, VL, PL, Autre].
+    Vectorized mapping of raw categories to [Vélos, Motos, VL, PL, Autre].
+    String rules are evaluated once per distinct label, then broadcast to the rows.
+    sterela_map (default STERELA_CATEGORY_MAP, empty) maps Sterela category numbers first.
     """
-    # TODO : use sterela category number for more robust mapping if available
-    cat = str(row.get('Category', '')).lower()
-    siredo = row.get('Category_SIREDO')
-    
-    # Robust check for 'Vélo' including potential encoding artifacts (Vï¿½lo, etc)
-    if any(x in cat for x in ['vélo', 'velo', 'vï¿½lo', 'vlo']):
-        return 'Vélos'
-    elif cat == 'moto':
-        return 'Motos'
-    elif siredo in [1, 12] or (cat == 'u3' and pd.isna(siredo)):
-        return 'VL'
-    elif siredo in [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 14]:
-        return 'PL'
-    return 'Autre'
+    rules = CATEGORY_RULES if rules is None else rules
+    sterela_map = STERELA_CATEGORY_MAP if sterela_map is None else sterela_map
+
+    if 'Category' in df.columns:
+        label_codes, label_uniques = pd.factorize(df['Category'], use_na_sentinel=False)
+        label_uniques = pd.Series(label_uniques, dtype=object).fillna('').astype(str).str.lower()
+    else:
+        label_codes = np.zeros(len(df), dtype=np.intp)
+        label_uniques = pd.Series([''])
+
+    if 'Category_SIREDO' in df.columns:
+        siredo_codes, siredo_uniques = pd.factorize(df['Category_SIREDO'], use_na_sentinel=False)
+        siredo_uniques = pd.Series(siredo_uniques)
+    else:
+        siredo_codes = np.zeros(len(df), dtype=np.intp)
+        siredo_uniques = pd.Series([np.nan])
+
+    conditions = []
+    choices = []
+    if sterela_map and 'Category_Sterela' in df.columns:
+        sterela = df['Category_Sterela']
+        for label in dict.fromkeys(sterela_map.values()):
+            numbers = [k for k, v in sterela_map.items() if v == label]
+            conditions.append(sterela.isin(numbers).to_numpy())
+            choices.append(label)
+
+    for label, kind, values in rules:
+        if kind == 'label_contains':
+            matches = label_uniques.apply(lambda c: any(x in c for x in values)).to_numpy(dtype=bool)
+            cond = matches[label_codes]
+        elif kind == 'label_equals':
+            cond = label_uniques.isin(values).to_numpy()[label_codes]
+        elif kind == 'siredo':
+            cond = siredo_uniques.isin(values).to_numpy()[siredo_codes]
+        elif kind == 'label_without_siredo':
+            cond = label_uniques.isin(values).to_numpy()[label_codes] & siredo_uniques.isna().to_numpy()[siredo_codes]
+        else:
+            raise ValueError(f"Unknown category rule kind: {kind}")
+        conditions.append(cond)
+        choices.append(label)
+
+    # Select on small integer codes, then broadcast the labels
+    labels = np.array(choices + ['Autre'], dtype=object)
+    codes = np.select(conditions, np.arange(len(choices)), default=len(choices)) if conditions else np.full(len(df), len(choices))
+    return pd.Series(labels[codes], index=df.index)
 
 def process_data(df):
     """
@@ -300,19 +1209,97 @@ def process_data(df):
     if df.empty:
         return df
 
-    # Localize Days
-    df['Weekday_FR'] = df['Weekday'].map(FRENCH_DAYS)
-    
-    # Unified Category
-    df['UnifiedCategory'] = df.apply(_get_unified_category, axis=1)
+    # Unified Category (vectorized, see CATEGORY_RULES)
+    df['UnifiedCategory'] = unify_categories(df)
     
     # Filter out 'Autre' immediately as requested for this dashboard
     df = df[df['UnifiedCategory'] != 'Autre'].reset_index(drop=True)
     
-    # Define DayType (JO vs WE)
-    # Using numpy where is faster and cleaner than apply
-    df['DayType'] = np.where(df['Weekday'].isin(['Saturday', 'Sunday']), 'WE', 'JO')
+    # Localize Days and define DayType (JO vs WE)
+    _add_day_features(df)
+
+    return df
+
+def build_hourly_cube(df):
+    """
+    Aggregates per-vehicle passages into an hourly cube: one row per hour x Direction x UnifiedCategory
+    with the passage count (Count) and the speed sum / number of valid speeds (SpeedSum, SpeedCount).
+    The cube carries the same calendar columns as the raw frame, so count-only consumers can use it as is.
+    """
+    if df.empty:
+        return pd.DataFrame()
+
+    # Floor in UTC: Paris offsets are whole hours, and this avoids ambiguous local times on DST change
+    hours = df['Datetime'].dt.tz_convert('UTC').dt.floor('h').dt.tz_convert(TZ)
+    speed = df['Speed'] if 'Speed' in df.columns else pd.Series(np.nan, index=df.index)
+    keys = pd.DataFrame({
+        'Datetime': hours,
+        'Direction': df['Direction'],
+        'UnifiedCategory': df['UnifiedCategory'],
+        'Speed': speed
+    })
+    cube = keys.groupby(['Datetime', 'Direction', 'UnifiedCategory'], observed=True, dropna=False)['Speed'].agg(
+        Count='size', SpeedSum='sum', SpeedCount='count'
+    ).reset_index()
+
+    _add_temporal_features(cube)
+    _add_day_features(cube)
+    return cube
+
+# Compact column types of the site frames (raw and hourly cube), enforced before
+# every Parquet write and again on read. Fixed categories keep stable codes
+# (Weekday codes are the weekday numbers, Monday = 0).
+CATEGORICAL_COLUMNS = {
+    'Weekday': list(FRENCH_DAYS.keys()),
+    'Weekday_FR': DAYS_ORDER_FR,
+    'DayType': ['JO', 'WE'],
+    'UnifiedCategory': None,  # categories taken from the data
+    'Direction': None,
+    'Lane': None,
+    'Category': None,
+}
+INTEGER_COLUMNS = {
+    'Hour': 'int8',
+    'Month': 'int8',
+    'Year': 'int16',
+    'MonthDay': 'int16',
+    'Count': 'int32',
+    'SpeedCount': 'int32',
+}
+
+def enforce_schema(df, label=None):
+    """
+    Converts the site frame to its compact schema: categoricals for the label columns,
+    small integers for the calendar parts and a datetime64 Date column.
+    If a label is given, the memory saved is reported.
+    """
+    if df.empty:
+        return df
+    bytes_before = df.memory_usage(deep=True).sum() if label else 0
+
+    for col, categories in CATEGORICAL_COLUMNS.items():
+        if col not in df.columns:
+            continue
+        if categories is None:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+            # Data-driven categories are kept as strings, whatever the reader inferred (1 vs '1')
+            if pd.api.types.infer_dtype(df[col].cat.categories) != 'string':
+                df[col] = df[col].map(str, na_action='ignore').astype('category')
+        elif df[col].dtype != pd.CategoricalDtype(categories):
+            df[col] = pd.Categorical(df[col], categories=categories)
+
+    for col, dtype in INTEGER_COLUMNS.items():
+        if col in df.columns and df[col].dtype != dtype and not df[col].isna().any():
+            df[col] = df[col].astype(dtype)
+
+    if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'])
 
+    if label:
+        bytes_after = df.memory_usage(deep=True).sum()
+        print(f"Compact schema for {label}: {bytes_before / 1e6:.1f} MB -> {bytes_after / 1e6:.1f} MB "
+              f"({(bytes_before - bytes_after) / 1e6:.1f} MB saved)")
     return df
 
 # For Backward Compatibility
@@ -62,6 +62,13 @@ def create_controls_check(picker_id, min_date, max_date, export_btn_id=None, pre
                        style={"width": "38px", "height": "38px", "padding": "0", "display": "flex", "alignItems": "center", "justifyContent": "center"}, 
                        title="Exporter le rapport")
         )
+        # Report built in the background: the progress bar is shown while the job is polled
+        export_section.extend([
+            dbc.Progress(id=f"{prefix}-export-progress", value=0, striped=True, animated=True,
+                         className="ms-2", style={"width": "120px", "height": "18px", "display": "none"}),
+            dcc.Interval(id=f"{prefix}-export-poll", interval=500, disabled=True),
+            dcc.Store(id=f"{prefix}-export-job"),
+        ])
     
     # Season Controls
     months = [
@@ -124,7 +131,7 @@ def create_controls_check(picker_id, min_date, max_date, export_btn_id=None, pre
                             ], id=f"{prefix}-standard-controls", className="text-center")
                         ], width=6, className="d-flex align-items-center justify-content-center"),
                         
-                        dbc.Col(html.Div(export_section), width=3, className="d-flex align-items-center justify-content-end")
+                        dbc.Col(html.Div(export_section, className="d-flex align-items-center"), width=3, className="d-flex align-items-center justify-content-end")
                     ], className="align-items-center"),
                     
                     season_controls
@@ -147,6 +154,7 @@ def create_dashboard_layout(df, dashboard_type="ROUTIER"):
     ids = {
         'picker': 'period-picker' if is_road else 'ped-date-picker',
         'export_btn': 'export-btn' if is_road else 'ped-export-btn',
+        'download': 'download-report' if is_road else 'ped-download-report',
         'tab_synth_val': 'tab-synthese', # Unified
         'tab_temp_val' : 'tab-temporal',
         'tab_ann_val'  : 'tab-annual',
@@ -179,8 +187,8 @@ def create_dashboard_layout(df, dashboard_type="ROUTIER"):
             html.Hr(),
             html.H6("Lexique", className="fw-bold mb-2"),
             html.Div([html.Strong("TMJ :"), " Trafic Moyen Journalier (Moyenne quotidienne sur la période)."], className="mb-1"),
-            html.Div([html.Strong("TMJ JO :"), " Trafic Moyen Journalier des Jours Ouvrés (Lun-Ven)."], className="mb-1"),
-            html.Div([html.Strong("TMJ WE :"), " Trafic Moyen Journalier des Week-ends (Sam-Dim)."], className="mb-1"),
+            html.Div([html.Strong("TMJ JO :"), " Trafic Moyen Journalier des Jours Ouvrés (Lun-Ven, hors jours fériés)."], className="mb-1"),
+            html.Div([html.Strong("TMJ WE :"), " Trafic Moyen Journalier des Week-ends (Sam-Dim) et jours fériés."], className="mb-1"),
             html.Div([html.Strong("VT :"), " Vitesse Moyenne (si disponible)."], className="mb-1"),
             html.Div([html.Strong("VL :"), " Véhicules Légers (Voitures < 3.5t)."], className="mb-1"),
             html.Div([html.Strong("PL :"), " Poids Lourds (> 3.5t)."], className="mb-1"),
@@ -198,7 +206,7 @@ def create_dashboard_layout(df, dashboard_type="ROUTIER"):
     header = create_header(site_name, dashboard_type=dashboard_type, help_content=help_content, map_btn_id="map-btn")
     
     prefix = "road" if is_road else "ped"
-    controls = create_controls_check(ids['picker'], min_date, max_date, export_btn_id=ids['export_btn'] if is_road else None, prefix=prefix) 
+    controls = create_controls_check(ids['picker'], min_date, max_date, export_btn_id=ids['export_btn'], prefix=prefix) 
     
     # --- 3. Build Tabs Content ---
     
@@ -224,7 +232,7 @@ def create_dashboard_layout(df, dashboard_type="ROUTIER"):
         temporal_content = dbc.Container([
             dbc.Row([dbc.Col(dbc.Card([dbc.CardHeader("FILTRES D'ANALYSE", className="bg-white fw-bold"), dbc.CardBody([
                 dbc.Row([
-                    dbc.Col([html.Label("Echelle de Temps", className="text-muted small fw-bold text-uppercase"), dcc.RadioItems(id='chart-freq', options=[{'label': 'Horaire', 'value': 'H'}, {'label': 'Journalier', 'value': 'D'}, {'label': 'Mensuel', 'value': 'M'}], value='D', inline=True, inputStyle={"margin-right": "5px", "margin-left": "10px"})], width=4),
+                    dbc.Col([html.Label("Echelle de Temps", className="text-muted small fw-bold text-uppercase"), dcc.RadioItems(id='chart-freq', options=[{'label': 'Auto', 'value': 'A'}, {'label': 'Horaire', 'value': 'H'}, {'label': 'Journalier', 'value': 'D'}, {'label': 'Mensuel', 'value': 'M'}], value='A', inline=True, inputStyle={"margin-right": "5px", "margin-left": "10px"})], width=4),
                     dbc.Col([html.Label("Catégories", className="text-muted small fw-bold text-uppercase"), dcc.Dropdown(id='chart-cats', options=[{'label': c, 'value': c} for c in ['Vélos', 'Motos', 'VL', 'PL']], value=['Vélos', 'Motos', 'VL', 'PL'], multi=True)], width=4),
                     dbc.Col([html.Label("Sens de Circulation", className="text-muted small fw-bold text-uppercase"), dcc.Checklist(id='chart-directions', options=[{'label': f' {d1_label}', 'value': '1'}, {'label': f' {d2_label}', 'value': '2'}], value=['1', '2'], inline=True, inputStyle={"margin-right": "5px", "margin-left": "10px"})], width=4)
                 ])
@@ -308,6 +316,6 @@ def create_dashboard_layout(df, dashboard_type="ROUTIER"):
         controls, 
         tabs, 
         map_modal, 
-        dcc.Download(id="download-report")
+        dcc.Download(id=ids['download'])
     ], fluid=True, className="px-4 py-3 bg-light", style={"minHeight": "100vh"})
                      
\ No newline at end of file
@@ -1,121 +1,187 @@
 import dash
 from dash import Input, Output, html, State, ctx, dcc, callback
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-from data_loader import DataManager
+from data_loader import DataManager, hourly_profile_window
 from layout import create_dashboard_layout, create_breadcrumb
+from report_generator import generate_html_report
+from report_jobs import ReportJobs, request_key
 from utils import (
     COLOR_MAP, 
-    filter_by_date,
     filter_by_season,
-    compute_metrics
+    compute_pedestrian_metrics,
+    pedestrian_day_counts,
+    PEDESTRIAN_INDICATORS,
+    resolution_for_span,
+    season_mask,
+    local_day_bounds,
+    DAYS_ORDER_FR,
+    TZ,
 )
 
 dash.register_page(__name__, path_template='/dashboard/pedestre/<site_id>', title='Tableau de Bord Piéton')
 
+# Report titles of the figures of the temporal tab, in report order
+TEMPORAL_FIGURES = ["Evolution Temporelle", "Matrice Horaire"]
+
 # --- Helpers ---
 
-def _compute_pedestrian_metrics(df, nb_days_total, nb_days_jo, nb_days_we):
+def _slice_daily_totals(daily, start_date, end_date, season_mode, sm, sd, em, ed):
     """
-    Computes: [Total, Avg Daily, Avg Workday, Avg Weekend, Peak Day, Peak Count, Max Day of Week]
+    Days of the daily totals table in the period (end date included) and, optionally, the season.
     """
-    if df.empty:
-        return ["-"] * 8
-        
-    # Aggregate by day first to get daily stats
-    daily_df = df.groupby('Date')['Count'].sum().reset_index()
-    
-    total = daily_df['Count'].sum()
-    avg_daily = total / max(1, nb_days_total)
-    
-    # Filter for JO/WE
-    # We need to join with Weekday info or re-derive
-    daily_df['Datetime'] = pd.to_datetime(daily_df['Date'])
-    daily_df['Weekday'] = daily_df['Datetime'].dt.day_name()
-    daily_df['IsWE'] = daily_df['Weekday'].isin(['Saturday', 'Sunday'])
-    
-    # JO
-    jo_data = daily_df[~daily_df['IsWE']]
-    total_jo = jo_data['Count'].sum()
-    avg_jo = total_jo / max(1, nb_days_jo) if nb_days_jo > 0 else 0
-    
-    # WE
-    we_data = daily_df[daily_df['IsWE']]
-    total_we = we_data['Count'].sum()
-    avg_we = total_we / max(1, nb_days_we) if nb_days_we > 0 else 0
+    if not daily.empty and start_date and end_date:
+        daily = daily.loc[pd.to_datetime(start_date).normalize():pd.to_datetime(end_date).normalize()]
+    if season_mode and not daily.empty:
+        daily = filter_by_season(daily, sm, sd, em, ed, False)
+    return daily
+
+def _timeline_series(pyramid, resolution, bounds=None, season=None):
+    """
+    Count series of the timeline at a resolution ('H', 'D' or 'M'): the hourly or daily level of
+    the pyramid (DataManager.get_timeline_pyramid) sliced to the period bounds, out-of-season bins
+    set to NaN and empty bins trimmed at both ends. Months are resampled from the daily slice.
+    """
+    level = pyramid['H' if resolution == 'H' else 'D']
+    if bounds:
+        lo, hi = level.index.searchsorted(list(bounds))
+        level = level.iloc[lo:hi]
+    if season:
+        level = level.where(season_mask(level.index, *season))
+    valid = level.notna().to_numpy()
+    if not valid.any():
+        return level.iloc[:0]
+    level = level.iloc[valid.argmax():len(valid) - valid[::-1].argmax()]
+    if resolution == 'M':
+        level = level.resample('MS').sum(min_count=1)
+    return level
+
+def _period_key(site_id, start_date, end_date, season_mode, sm, sd, em, ed):
+    """
+    Identifies the period / season the temporal tab was rendered for (kept in 'ped-temporal-rendered').
+    """
+    return [site_id, start_date, end_date, [sm, sd, em, ed] if season_mode else None]
+
+def _temporal_figures(site_id, start_date, end_date, season=None, relayout_data=None, zoom_only=False):
+    """
+    Timeline and weekday x hour heatmap of the temporal tab (also built by the report export).
+    relayout_data is the zoom of the timeline (None: whole period). zoom_only: zoom / pan of the
+    timeline, only its visible window is built and the heatmap is None. ({}, {}) without data.
+    """
+    dm = DataManager()
+    s_date = pd.to_datetime(start_date)
+    e_date = pd.to_datetime(end_date)
+
+    # Hourly / daily levels of the site, the period and season are applied by slicing them
+    pyramid = dm.get_timeline_pyramid(site_id)
+    # Whole local days (a DST change day keeps its 23 or 25 hours), as the heatmap and synthesis
+    bounds = local_day_bounds(start_date, end_date)
     
-    # Peak
-    if not daily_df.empty:
-        peak_idx = daily_df['Count'].idxmax()
-        peak_row = daily_df.loc[peak_idx]
-        peak_day = peak_row['Date'].strftime('%d/%m/%Y') if pd.notnull(peak_row['Date']) else "-"
-        peak_count = peak_row['Count']
-    else:
-        peak_day = "-"
-        peak_count = 0
-        
-    # Busiest Day of Week
-    # Average by Weekday
-    if not daily_df.empty:
-        weekday_avg = daily_df.groupby('Weekday')['Count'].mean()
-        # Translate to French for display
-        french_days = {'Monday': 'Lundi', 'Tuesday': 'Mardi', 'Wednesday': 'Mercredi',
-                       'Thursday': 'Jeudi', 'Friday': 'Vendredi', 'Saturday': 'Samedi', 'Sunday': 'Dimanche'}
-        # Sort by standard week to find max? Or just idxmax
-        max_day_en = weekday_avg.idxmax()
-        max_day = french_days.get(max_day_en, max_day_en)
+    if pyramid is None or _timeline_series(pyramid, 'D', bounds, season).empty:
+        return {}, {}
+
+    # --- Dynamic Granularity Logic ---
+    current_visible_start = s_date
+    current_visible_end = e_date
+
+    if relayout_data:
+        if 'xaxis.range[0]' in relayout_data:
+            try:
+                current_visible_start = pd.to_datetime(relayout_data['xaxis.range[0]'])
+                current_visible_end = pd.to_datetime(relayout_data['xaxis.range[1]'])
+            except:
+                pass
+        elif 'xaxis.range' in relayout_data: # sometimes array
+             try:
+                current_visible_start = pd.to_datetime(relayout_data['xaxis.range'][0])
+                current_visible_end = pd.to_datetime(relayout_data['xaxis.range'][1])
+             except:
+                pass
+
+    # Decision Thresholds (shared with the road timeline)
+    resolution = resolution_for_span(current_visible_start, current_visible_end)
+
+    if resolution == 'M': # Broad view -> Monthly
+         title_suffix = "Mensuelle"
+         chart_type = 'bar'
+    elif resolution == 'H': # Very close -> Hourly
+         title_suffix = "Horaire"
+         chart_type = 'line'
+    else: # Default -> Daily
+         title_suffix = "Journalière"
+         chart_type = 'line'
+
+    series = _timeline_series(pyramid, resolution, bounds, season)
+    if zoom_only and resolution != 'M' and ('xaxis.range[0]' in relayout_data or 'xaxis.range' in relayout_data):
+        # Visible window, with one window width on each side so that a pan shows data at once
+        span = current_visible_end - current_visible_start
+        try:
+            lo, hi = series.index.searchsorted([
+                (current_visible_start - span).tz_localize(TZ, ambiguous=True, nonexistent='shift_forward'),
+                (current_visible_end + span).tz_localize(TZ, ambiguous=True, nonexistent='shift_forward'),
+            ])
+            series = series.iloc[lo:hi]
+        except (ValueError, TypeError):
+            pass
+    resampled = series.rename_axis('Datetime').reset_index(name='Count')
+
+    # Built with graph_objects: plotly express costs more than the slicing on every zoom
+    color = COLOR_MAP.get('Piétons', '#27AE60')
+    if chart_type == 'bar':
+         trace = go.Bar(x=resampled['Datetime'], y=resampled['Count'], marker_color=color,
+                        hovertemplate="%{x|%b %Y} : %{y} passages<extra></extra>")
     else:
-        max_day = "-"
-
-    return [
-        f"{int(total):,}".replace(",", " "),
-        f"{int(round(avg_daily)):,}".replace(",", " "),
-        f"{int(round(avg_jo)):,}".replace(",", " "),
-        f"{int(round(avg_we)):,}".replace(",", " "),
-        peak_day,
-        f"{int(peak_count):,}".replace(",", " "),
-        max_day
-    ]
-
-def _build_synthesis_table(period_df, start_date, end_date, is_seasonal=False):
-    if period_df.empty:
+         # WebGL beyond 1000 points, as plotly express does
+         scatter = go.Scattergl if len(resampled) > 1000 else go.Scatter
+         trace = scatter(x=resampled['Datetime'], y=resampled['Count'], mode='lines', line_color=color, fill='tozeroy',
+                         hovertemplate="Date=%{x}<br>Passages=%{y}<extra></extra>")
+    fig_timeline = go.Figure(trace)
+    fig_timeline.update_layout(title=f"Évolution ({title_suffix})", template='plotly_white',
+                               xaxis_title='Date', yaxis_title='Passages', margin=dict(t=60))
+    if chart_type == 'bar':
+         fig_timeline.update_layout(bargap=0.1)
+         fig_timeline.update_xaxes(dtick="M2", tickformat="%b\n%Y")
+
+    # Prevent un-zooming: If we detected a zoom, re-apply it.
+    # But only if the zoom is smaller than the date-picker range?
+    # Actually, simpler: if relayout triggered this update, keep the range.
+    if zoom_only and relayout_data and ('xaxis.range[0]' in relayout_data or 'xaxis.range' in relayout_data):
+         fig_timeline.update_layout(xaxis_range=[current_visible_start, current_visible_end])
+
+    if zoom_only:
+        return fig_timeline, None
+
+    # --- Heatmap ---
+    # Mean per record of each weekday x hour, from the per-weekday prefix sums of the site:
+    # the days of the period / season are selected, the hourly rows are not read
+    hourly = dm.get_hourly_profiles(site_id)
+    days = hourly['days']
+    selected = season_mask(days, *season) if season else np.ones(len(days), dtype=bool)
+    if bounds:
+        selected &= (days >= bounds[0].tz_localize(None)) & (days < bounds[1].tz_localize(None))
+    sums, counts = hourly_profile_window(hourly, selected)
+    # Cells without any record stay at 0, as in the previous density heatmap
+    mean_counts = np.divide(sums, counts, out=np.zeros(sums.shape), where=counts > 0)
+
+    fig_heatmap = go.Figure(go.Heatmap(
+        z=mean_counts, x=list(range(24)), y=DAYS_ORDER_FR, colorscale="Viridis",
+        colorbar=dict(title="Moyenne des passages"),
+        hovertemplate="Jour: %{y}<br>Heure: %{x}:00<br>Passages (Moy): %{z:.2f}<extra></extra>"
+    ))
+    fig_heatmap.update_layout(title="Intensité Moyenne (Semaine Type)", template='plotly_white',
+                              xaxis_title='Heure', yaxis_title='Jour')
+    return fig_timeline, fig_heatmap
+
+def _build_synthesis_table(daily, start_date, end_date, is_seasonal=False):
+    if daily.empty:
         return html.Div("Pas de données sur la période.")
         
-    # Calculate days based on range, not just data presence, to get correct averages?
-    # Usually averages are over the selected period.
-    if is_seasonal:
-        dates_df = pd.DataFrame({'Date': period_df['Date'].unique()})
-    else:
-        s_date = pd.to_datetime(start_date or period_df['Datetime'].min()).date()
-        e_date = pd.to_datetime(end_date or period_df['Datetime'].max()).date()
-        date_range = pd.date_range(start=s_date, end=e_date, freq='D')
-        dates_df = pd.DataFrame({'Date': date_range})
-        
-    dates_df['Date'] = pd.to_datetime(dates_df['Date']) # Ensure datetime
-    dates_df['DayName'] = dates_df['Date'].dt.day_name()
-    dates_df['IsWE'] = dates_df['DayName'].isin(['Saturday', 'Sunday'])
-    
-    nb_days_total = len(dates_df)
-    nb_days_jo = len(dates_df[~dates_df['IsWE']])
-    nb_days_we = len(dates_df[dates_df['IsWE']])
-    
-    metrics = _compute_pedestrian_metrics(period_df, nb_days_total, nb_days_jo, nb_days_we)
-    
-    labels = [
-        "Fréquentation totale",
-        "Moyenne journalière (FMJ)",
-        "Moyenne jours ouvrés (JO)",
-        "Moyenne week-end (WE)",
-        "Jour du pic de fréquentation",
-        "Pic de fréquentation",
-        "Jour de la semaine le plus fréquenté"
-    ]
+    metrics = compute_pedestrian_metrics(daily, *pedestrian_day_counts(daily, start_date, end_date, is_seasonal))
     
     rows = []
-    for lbl, val in zip(labels, metrics):
+    for lbl, val in zip(PEDESTRIAN_INDICATORS, metrics):
         rows.append(html.Tr([
             html.Td(lbl, className="fw-bold"),
             html.Td(str(val), className="text-end")
@@ -128,18 +194,24 @@ def layout(site_id=None):
         return dbc.Container(html.Div("Site non spécifié", className="alert alert-danger mt-5"))
         
     dm = DataManager()
-    df = dm.get_data(site_id)
+    # The layout only needs the date bounds of the site
+    df = dm.query(site_id, columns=['Datetime'])
     
     if df.empty:
          return dbc.Container(html.Div(f"Pas de données trouvées pour le site: {site_id}", className="alert alert-warning mt-5"))
     
-    # Store site_id
+    # Daily totals built at load time, the synthesis tab is served from them
+    dm.get_daily_totals(site_id)
+    
+    # Store site_id, and the period the temporal figures were last rendered for (see export_report)
     store = dcc.Store(id='ped-site-id', data=site_id)
+    temporal_rendered = dcc.Store(id='ped-temporal-rendered')
     
     # Unified layout
     ped_layout = create_dashboard_layout(df, dashboard_type="PIÉTON")
     
     ped_layout.children.insert(0, store)
+    ped_layout.children.insert(0, temporal_rendered)
     
     # Add navigation breadcrumb
     breadcrumb = create_breadcrumb(df.attrs.get('metadata', {}).get('site_name', site_id))
@@ -161,7 +233,8 @@ def toggle_ped_season(val):
     [Output("ped-content-synthese", "children"),
      Output("ped-timeline-graph", "figure"),
      Output("ped-heatmap-day-hour", "figure"),
-     Output("ped-content-annual", "children")],
+     Output("ped-content-annual", "children"),
+     Output("ped-temporal-rendered", "data")],
     [Input("ped-tabs", "value"),
      Input("ped-date-picker", "start_date"),
      Input("ped-date-picker", "end_date"),
@@ -175,17 +248,6 @@ def toggle_ped_season(val):
 )
 def update_content(active_tab, start_date, end_date, season_mode, sm, sd, em, ed, relayout_data, site_id):
     dm = DataManager()
-    df = dm.get_data(site_id)
-    
-    # Filter Data
-    # 1. Date Range
-    filtered_df = filter_by_date(df, start_date, end_date)
-    s_date = pd.to_datetime(start_date)
-    e_date = pd.to_datetime(end_date)
-    
-    # 2. Season Intersection
-    if season_mode:
-        filtered_df = filter_by_season(filtered_df, sm, sd, em, ed, False) # For seasonal filtering, we don't need the theoretical days count as we're only looking at actual data presence
     
     synthese_content = html.Div()
     annual_content = html.Div()
@@ -197,125 +259,43 @@ def update_content(active_tab, start_date, end_date, season_mode, sm, sd, em, ed
         if season_mode:
              label_period += f" (Filtré: {sd}/{sm} - {ed}/{em})"
              
+        # Indicators are served by the daily totals table, the hourly rows are not read
+        daily = _slice_daily_totals(dm.get_daily_totals(site_id), start_date, end_date, season_mode, sm, sd, em, ed)
         synthese_content = dbc.Card([
             dbc.CardHeader(f"INDICATEURS CLÉS", className="bg-white fw-bold"),
-            dbc.CardBody(_build_synthesis_table(filtered_df, start_date, end_date, is_seasonal=season_mode), className="p-0")
+            dbc.CardBody(_build_synthesis_table(daily, start_date, end_date, is_seasonal=season_mode), className="p-0")
         ], className="shadow-sm border-0")
-        return synthese_content, dash.no_update, dash.no_update, dash.no_update
+        return synthese_content, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
     elif active_tab == "tab-temporal":
-        if filtered_df.empty:
-            return dash.no_update, {}, {}, dash.no_update
-
-        # --- Dynamic Granularity Logic ---
-        current_visible_start = s_date
-        current_visible_end = e_date
+        # Zoom / pan: only the timeline is updated, from the visible window of the pyramid
+        zoom_only = ctx.triggered_id == 'ped-timeline-graph'
+        if zoom_only and not (relayout_data and any(k.startswith('xaxis.') for k in relayout_data)):
+            return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
         
-        if relayout_data:
-            if 'xaxis.range[0]' in relayout_data:
-                try:
-                    current_visible_start = pd.to_datetime(relayout_data['xaxis.range[0]'])
-                    current_visible_end = pd.to_datetime(relayout_data['xaxis.range[1]'])
-                except:
-                    pass
-            elif 'xaxis.range' in relayout_data: # sometimes array
-                 try:
-                    current_visible_start = pd.to_datetime(relayout_data['xaxis.range'][0])
-                    current_visible_end = pd.to_datetime(relayout_data['xaxis.range'][1])
-                 except:
-                    pass
-
-        duration = current_visible_end - current_visible_start
-        days = duration.days
-        
-        # Decision Thresholds
-        freq = 'D'
-        title_suffix = "Journalier"
-        chart_type = 'line' # Default requested
-        
-        if days > 400: # Broad view -> Monthly
-             freq = 'MS' # Monthly
-             title_suffix = "Mensuelle"
-             chart_type = 'bar'
-        elif days < 14: # Very close -> Hourly
-             freq = 'h'
-             title_suffix = "Horaire"
-             chart_type = 'line'
-        else: # Default -> Daily
-             freq = 'D'
-             title_suffix = "Journalière"
-             chart_type = 'line'
-
-        target_df = filtered_df.copy()
-        resampled = target_df .groupby(pd.Grouper(key='Datetime', freq=freq))['Count'].sum(min_count=1).reset_index()
-        
-        if chart_type == 'bar':
-             fig_timeline = px.bar(resampled, x='Datetime', y='Count', 
-                                  title=f"Évolution ({title_suffix})",
-                                  labels={'Datetime': 'Date', 'Count': 'Passages'},
-                                  template='plotly_white', color_discrete_sequence=[COLOR_MAP.get('Piétons', '#27AE60')])
-             fig_timeline.update_layout(bargap=0.1)
-             fig_timeline.update_traces(hovertemplate="%{x|%b %Y} : %{y} passages<extra></extra>")
-             fig_timeline.update_xaxes(dtick="M2", tickformat="%b\n%Y")
-        else:
-             fig_timeline = px.line(resampled, x='Datetime', y='Count', 
-                                   title=f"Évolution ({title_suffix})",
-                                   labels={'Datetime': 'Date', 'Count': 'Passages'},
-                                   template='plotly_white', color_discrete_sequence=[COLOR_MAP.get('Piétons', '#27AE60')])  
-             fig_timeline.update_traces(fill='tozeroy')
-
-        # Prevent un-zooming: If we detected a zoom, re-apply it.
-        # But only if the zoom is smaller than the date-picker range?
-        # Actually, simpler: if relayout triggered this update, keep the range.
-        if ctx.triggered_id == 'ped-timeline-graph' and relayout_data and ('xaxis.range[0]' in relayout_data or 'xaxis.range' in relayout_data):
-             fig_timeline.update_layout(xaxis_range=[current_visible_start, current_visible_end])
-
-        timeline_fig = fig_timeline
-
-        # --- Heatmap ---
-        grp = filtered_df.groupby(['Weekday', 'Hour'])['Count'].mean().reset_index()
-        grp['Weekday'] = pd.Categorical(grp['Weekday'], categories=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], ordered=True)
-        grp = grp.sort_values('Weekday')
-        grp['Weekday_FR'] = grp['Weekday'].map({
-            'Monday': 'Lundi', 'Tuesday': 'Mardi', 'Wednesday': 'Mercredi',
-            'Thursday': 'Jeudi', 'Friday': 'Vendredi', 'Saturday': 'Samedi', 'Sunday': 'Dimanche'
-        })
-        
-        fig_heatmap = px.density_heatmap(grp, x='Hour', y='Weekday_FR', z='Count', 
-                                         title="Intensité Moyenne (Semaine Type)",
-                                         labels={'Hour': 'Heure', 'Weekday_FR': 'Jour', 'Count': 'Passages (Moy)'},
-                                         nbinsx=24, nbinsy=7, color_continuous_scale="Viridis",
-                                         category_orders={"Weekday_FR": ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']},)
-        fig_heatmap.update_layout(template='plotly_white')
-        fig_heatmap.update_traces( hovertemplate="Jour: %{y}<br>Heure: %{x}:00<br>Passages (Moy): %{z:.2f}<extra></extra>")
-        fig_heatmap.update_coloraxes(colorbar_title="Moyenne des passages")
-        heatmap_fig = fig_heatmap
-
-        return dash.no_update, timeline_fig, heatmap_fig, dash.no_update
+        season = (sm, sd, em, ed) if season_mode else None
+        timeline_fig, heatmap_fig = _temporal_figures(site_id, start_date, end_date, season, relayout_data, zoom_only)
+        if heatmap_fig is None:
+            return dash.no_update, timeline_fig, dash.no_update, dash.no_update, dash.no_update
+
+        return dash.no_update, timeline_fig, heatmap_fig, dash.no_update, _period_key(site_id, start_date, end_date, season_mode, sm, sd, em, ed)
 
     elif active_tab == "tab-annual":
-        df_annual = df.copy()
-        df_annual['DOY'] = df_annual['Datetime'].dt.dayofyear
-        
-        # Force Integer Year
-        df_annual['Year'] = pd.to_numeric(df_annual['Year'], errors='coerce').fillna(0).astype(int)
-        df_annual['YearStr'] = df_annual['Year'].astype(str)
-        
-        daily_annual = df_annual.groupby(['YearStr', 'DOY'])['Count'].sum().reset_index()
+        # Year x day-of-year matrix with its 7-day smoothing, cached per site until the data is rebuilt
+        profiles = dm.get_annual_profiles(site_id)
+        if profiles is None:
+             return dash.no_update, dash.no_update, dash.no_update, html.Div("Pas de données"), dash.no_update
+        smooth = profiles['smooth']
+        present = ~np.isnan(profiles['counts'])
         
-        # --- Smoothing for nicer "Ridgeline" visual ---
-        # Rolling average 7 days to smooth out the jagged daily peaks
-        daily_annual['Count_Smooth'] = daily_annual.groupby('YearStr')['Count'].transform(lambda x: x.rolling(7, min_periods=1, center=True).mean())
+        # Days of year drawn on a leap reference year
+        fake_dates = np.datetime64('2000-01-01') + np.arange(366).astype('timedelta64[D]')
         
-        daily_annual['FakeDate'] = pd.to_datetime(daily_annual['DOY'] - 1, unit='D', origin='2000-01-01')
-        
-        # Ridgeline Logic
-        years = sorted(daily_annual['YearStr'].unique(), reverse=True) # Top to bottom
-        if not years:
-             return dash.no_update, dash.no_update, dash.no_update, html.Div("Pas de données")
+        # Ridgeline Logic: top to bottom
+        rows = [r for r in range(len(profiles['years']) - 1, -1, -1) if present[r].any()]
 
         # Dynamic offset based on max smoothed value to ensure consistent look
-        max_val = daily_annual['Count_Smooth'].max()
+        max_val = np.nanmax(smooth[rows])
         # Increased spacing to reduce overlap (was 0.35)
         offset_step = max_val * 0.75 
         
@@ -323,21 +303,20 @@ def update_content(active_tab, start_date, end_date, season_mode, sm, sd, em, ed
         
         fill_color = COLOR_MAP.get('Piétons', '#27AE60')
         
-        for i, year in enumerate(years):
-            d_year = daily_annual[daily_annual['YearStr'] == year].sort_values('DOY')
-            if d_year.empty:
-                continue
+        for i, row in enumerate(rows):
+            year = str(profiles['years'][row])
+            days = present[row]
             
             # Use specific scale factor to control height relative to spacing if needed
             # Here we just use the raw values, but spaced out more
             base_y = i * offset_step
             
-            x_vals = d_year['FakeDate'].tolist()
-            y_vals = (d_year['Count_Smooth'] + base_y).tolist()
+            x_vals = fake_dates[days]
+            y_vals = smooth[row, days] + base_y
             
             # Close polygon for fill (down to baseline)
-            x_poly = x_vals + x_vals[::-1]
-            y_poly = y_vals + [base_y] * len(y_vals)
+            x_poly = np.concatenate([x_vals, x_vals[::-1]])
+            y_poly = np.concatenate([y_vals, np.full(len(y_vals), base_y)])
             
             fig.add_trace(go.Scatter(
                 x=x_poly,
@@ -348,8 +327,6 @@ def update_content(active_tab, start_date, end_date, season_mode, sm, sd, em, ed
                 fillcolor=fill_color,
                 opacity=0.9, # Higher opacity to hide the lines behind, creating a cleaner "stack"
                 name=year,
-                # customdata=np.stack((d_year['Count'], d_year['YearStr']), axis=-1),
-                # hovertemplate=f"<b>%{{customdata[1]}}</b><br>Date: %{{x|%d %B}}<br>Fréquentation: %{{customdata[0]}}<extra></extra>",
                 showlegend=False
             ))
 
@@ -381,6 +358,77 @@ def update_content(active_tab, start_date, end_date, season_mode, sm, sd, em, ed
         )
         
         annual_content = dbc.Card(dbc.CardBody([dcc.Graph(id='ped-annual-graph', figure=fig, config={'locale': 'fr'})]), className="shadow-sm border-0")
-        return dash.no_update, dash.no_update, dash.no_update, annual_content
+        return dash.no_update, dash.no_update, dash.no_update, annual_content, dash.no_update
+
+    return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+@callback(
+    [Output("ped-download-report", "data"),
+     Output("ped-export-job", "data"),
+     Output("ped-export-poll", "disabled"),
+     Output("ped-export-progress", "value"),
+     Output("ped-export-progress", "label"),
+     Output("ped-export-progress", "style"),
+     Output("ped-export-btn", "disabled")],
+    [Input("ped-export-btn", "n_clicks"),
+     Input("ped-export-poll", "n_intervals")],
+    [State('ped-season-switch', 'value'),
+     State('ped-season-start-month', 'value'),
+     State('ped-season-start-day', 'value'),
+     State('ped-season-end-month', 'value'),
+     State('ped-season-end-day', 'value'),
+     State('ped-date-picker', 'start_date'),
+     State('ped-date-picker', 'end_date'),
+     State('ped-timeline-graph', 'figure'),
+     State('ped-heatmap-day-hour', 'figure'),
+     State('ped-temporal-rendered', 'data'),
+     State('ped-site-id', 'data'),
+     State("ped-export-job", "data"),
+     State("ped-export-progress", "style")],
+    prevent_initial_call=True
+)
+def export_report(n_clicks, n_intervals, season_mode, sm, sd, em, ed, start, end, f1, f2, temporal_rendered, site_id, job_key, progress_style):
+    jobs = ReportJobs()
+    if ctx.triggered_id == "ped-export-btn":
+        if not n_clicks or not site_id:
+            return (dash.no_update,) * 7
+        
+        # Temporal figures not rendered since the period / season changed are stale (or were never
+        # drawn): they are rebuilt in the job over the whole period, as on the road dashboard
+        temporal_current = temporal_rendered == _period_key(site_id, start, end, season_mode, sm, sd, em, ed)
+        shown = dict(zip(TEMPORAL_FIGURES, (f1, f2))) if temporal_current else {}
+        
+        season = (sm, sd, em, ed) if season_mode else None
+        if season_mode:
+            label = f"{start}_{end}_Saison_{sm:02d}-{sd:02d}_au_{em:02d}-{ed:02d}"
+        else:
+            label = f"{start}_{end}"
+
+        def build(progress):
+            # Indicators from the daily totals table, as in the synthesis tab
+            daily = _slice_daily_totals(DataManager().get_daily_totals(site_id), start, end, season_mode, sm, sd, em, ed)
+            figures = shown
+            if not temporal_current:
+                progress(0, "Graphiques temporels")
+                figures = dict(zip(TEMPORAL_FIGURES, _temporal_figures(site_id, start, end, season)))
+            return generate_html_report(daily, figures, label, progress=progress, kind='pedestrian',
+                                        start_date=start, end_date=end, is_seasonal=season_mode)
+
+        # Identical requests (same data, period, season and figures, or none if rebuilt) are served from the stored report
+        job_key = request_key('pedestrian', site_id, DataManager().data_signature(site_id), start, end, season, shown)
+        jobs.submit(job_key, f"Rapport_{site_id}_{label}.html", build)
+    elif not job_key:
+        return (dash.no_update,) * 7
 
-    return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    hidden = {**(progress_style or {}), "display": "none"}
+    status = jobs.status(job_key)
+    if status['state'] == 'done':
+        report_html = jobs.result(job_key)
+        if report_html is not None:
+            return dict(content=report_html, filename=status['filename']), None, True, 100, "", hidden, False
+    if status['state'] == 'running':
+        visible = {**(progress_style or {}), "display": "flex"}
+        return dash.no_update, job_key, False, status['progress'], f"{status['progress']} %", visible, True
+    # Failed or lost job: the button is enabled again for a retry
+    print(f"Report job {job_key} ended without result: {status['label']}")
+    return dash.no_update, None, True, 0, "", hidden, False
@@ -1,20 +1,29 @@
 import dash
-from dash import Input, Output, html, State, ctx, dcc, callback
+from dash import Input, Output, html, State, ctx, dcc, callback, clientside_callback
 import dash_bootstrap_components as dbc
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 import re
 from data_loader import DataManager
 from report_generator import generate_html_report
+from report_jobs import ReportJobs, request_key
 from utils import (
     COLOR_MAP, 
     COMMON_LAYOUT, 
     FRENCH_MONTHS_MAP, 
     DAYS_ORDER_FR, 
-    compute_metrics,
-    filter_by_date,
-    filter_by_season,
+    TZ,
+    SYNTHESIS_CATEGORIES,
+    compute_synthesis,
+    day_types,
+    heatmap_matrix,
+    minmax_downsample,
+    passage_counts,
+    resolution_for_span,
+    weekday_codes,
+    weekday_counts,
 )
 from layout import create_dashboard_layout, create_breadcrumb
 
@@ -36,8 +45,7 @@ def _build_synthesis_table(period_df, start_date, end_date, metadata=None, is_se
         dates_df = pd.DataFrame({'Date': date_range})
         
     dates_df['Date'] = pd.to_datetime(dates_df['Date'])
-    dates_df['DayName'] = dates_df['Date'].dt.day_name()
-    dates_df['IsWE'] = dates_df['DayName'].isin(['Saturday', 'Sunday'])
+    dates_df['IsWE'] = day_types(dates_df['Date']) == 'WE'  # public holidays count as WE
     
     if theoritical_days is None:
         nb_days_total = len(dates_df)
@@ -49,15 +57,14 @@ def _build_synthesis_table(period_df, start_date, end_date, metadata=None, is_se
         nb_days_we = theoritical_days['nb_WE_days']
     
     rows = []
-    categories = ['Vélos', 'Motos', 'VL', 'PL']
+    categories = SYNTHESIS_CATEGORIES
+    # All the cells in a single grouped pass over the period
+    synthesis = compute_synthesis(period_df, nb_days_total, nb_days_jo, nb_days_we, categories)
     
     def make_row_cells(label, filter_cat=None):
         cells = [html.Td(label, className="fw-bold")]
         for sens_code in ['1', '2']:
-            d_data = period_df[period_df['Direction'].astype(str).str.contains(sens_code)]
-            if filter_cat:
-                d_data = d_data[d_data['UnifiedCategory'] == filter_cat]
-            m = compute_metrics(d_data, nb_days_total, nb_days_jo, nb_days_we)
+            m = synthesis[(filter_cat, sens_code)]
             for val in m:
                 formatted = val if isinstance(val, str) else f"{val:,}".replace(",", " ")
                 cells.append(html.Td(formatted))
@@ -82,6 +89,235 @@ def _build_synthesis_table(period_df, start_date, end_date, metadata=None, is_se
     return dbc.Table([table_header, html.Tbody(rows, className="text-end")], 
                      bordered=True, hover=True, responsive=True, striped=True)
 
+# Pixel width assumed for the timeline until the browser reports it
+DEFAULT_GRAPH_WIDTH = 1200
+
+def _visible_range(relayout_data):
+    """
+    Zoomed x range (naive local Timestamps) from the relayoutData of a graph, None if not zoomed.
+    """
+    if not relayout_data:
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        bounds = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        bounds = relayout_data['xaxis.range']
+    else:
+        return None
+    try:
+        return tuple(pd.Timestamp(b).tz_localize(None) for b in bounds)
+    except (ValueError, TypeError):
+        return None
+
+def _downsample_hourly(wide, graph_width, visible=None):
+    """
+    Long (Datetime, Group, Count) frame of the hourly series (one column per Group), min/max
+    downsampled to about the pixel width of the graph. When zoomed, the visible window is sampled
+    at the same density on top of the whole range: zooming in refines the curve.
+    """
+    n_buckets = int(graph_width or DEFAULT_GRAPH_WIDTH)
+    times = wide.index
+    window = None
+    if visible:
+        try:
+            start, end = (b.tz_localize(TZ, ambiguous=True, nonexistent='shift_forward') for b in visible)
+            window = times.searchsorted(start), times.searchsorted(end, side='right')
+        except (ValueError, TypeError):
+            window = None
+    parts = []
+    for group in wide.columns:
+        values = wide[group].to_numpy(dtype=float)
+        kept = minmax_downsample(values, n_buckets)
+        if window and window[1] > window[0]:
+            lo, hi = window
+            kept = np.union1d(kept, lo + minmax_downsample(values[lo:hi], n_buckets))
+        parts.append(pd.DataFrame({'Datetime': times[kept], 'Group': group, 'Count': values[kept]}))
+    return pd.concat(parts, ignore_index=True)
+
+def _period_key(site_id, start_date, end_date, season_mode, sm, sd, em, ed):
+    """
+    Identifies the period / season a tab was rendered for (kept client-side in its '-rendered' Store).
+    """
+    return [site_id, start_date, end_date, [sm, sd, em, ed] if season_mode else None]
+
+RESOLUTION_LABELS = {'H': "Horaire", 'D': "Journalière", 'M': "Mensuelle"}
+
+# Report titles of the figures of the synthesis and temporal tabs, in report order
+SYNTHESIS_FIGURES = ["Part Modale (Vélos)", "Répartition Motorisée", "Toutes Mobilités"]
+TEMPORAL_FIGURES = ["Evolution Temporelle", "Matrice Horaire"]
+
+def _select_groups(frame, cats, directions, d1, d2):
+    """
+    Rows of the selected categories and directions, with the 'Category - direction' Group label of the timeline series.
+    """
+    cats = cats or []
+    directions = directions or []
+    
+    # Fast filtering with isin for categories
+    filtered_df = frame[frame['UnifiedCategory'].isin(cats)]
+    
+    # Direction codes are matched by containment ('1' in "Voie 1" etc.), in a single regex
+    pattern = '|'.join([re.escape(d) for d in directions])
+    if 'Direction' in filtered_df.columns and pattern:
+        filtered_df = filtered_df[filtered_df['Direction'].astype(str).str.contains(pattern, regex=True)]
+    
+    # SensLabel with numpy select
+    d_series = filtered_df['Direction'].astype(str)
+    sens_label = np.select([d_series.str.contains('1'), d_series.str.contains('2')], [d1, d2], default='Inconnu')
+    return filtered_df.assign(Group=filtered_df['UnifiedCategory'].astype(str) + " - " + sens_label)
+
+def _synthesis_figures(period_df):
+    """
+    Modal share, motorized split and all-mobilities pies of a period (synthesis tab and report).
+    """
+    if period_df.empty:
+        no_data = px.pie(title="Pas de données pour cette période / saison")
+        return no_data, no_data, no_data
+
+    # Passages per category, all pies are derived from it
+    cat_counts = passage_counts(period_df).groupby(period_df['UnifiedCategory'], observed=True).sum().sort_values(ascending=False)
+
+    # Optimized ModalGroup creation
+    modal_group = np.where(cat_counts.index == 'Vélos', 'Vélos', 'Motorisé')
+    modal_counts = cat_counts.groupby(modal_group).sum().sort_values(ascending=False).reset_index()
+    modal_counts.columns = ['Type', 'Count']
+    
+    fig_pie1 = px.pie(modal_counts, names='Type', values='Count', title=None, color='Type', hole=0.4, color_discrete_map=COLOR_MAP)
+    
+    mot_counts = cat_counts[cat_counts.index.isin(['Motos', 'VL', 'PL'])]
+    if not mot_counts.empty:
+        mot_counts = mot_counts.reset_index()
+        mot_counts.columns = ['Cat', 'Count']
+        fig_pie2 = px.pie(mot_counts, names='Cat', values='Count', title=None, color='Cat', hole=0.4, color_discrete_map=COLOR_MAP)
+    else:
+        fig_pie2 = px.pie(title="Pas de trafic motorisé")
+        
+    all_counts = cat_counts.reset_index()
+    all_counts.columns = ['Cat', 'Count']
+    fig_pie3 = px.pie(all_counts, names='Cat', values='Count', title=None, color='Cat', hole=0.4, color_discrete_map=COLOR_MAP)
+    
+    for fig in [fig_pie1, fig_pie2, fig_pie3]:
+        fig.update_layout(**COMMON_LAYOUT)
+        fig.update_traces(textinfo='percent+label', textposition='outside', marker=dict(line=dict(color='#FFFFFF', width=2)))
+        fig.update_xaxes(showgrid=False, zeroline=False, showticklabels=False)
+        fig.update_yaxes(showgrid=False, zeroline=False, showticklabels=False)
+
+    return fig_pie1, fig_pie2, fig_pie3
+
+def _temporal_figures(site_id, start_date, end_date, season, freq, cats, directions, graph_width=None, relayout_data=None, with_heatmap=True):
+    """
+    Timeline and weekday x hour heatmap of the temporal tab (also built by the report export).
+    relayout_data is the zoom to keep (None: whole period); with_heatmap=False skips the heatmap (None).
+    """
+    dm = DataManager()
+    df = dm.get_cube(site_id)
+    empty_figs = (px.line(title="Pas de données"), px.density_heatmap(title="Pas de données"))
+    
+    if df.empty: return empty_figs
+        
+    period_df, _ = dm.get_period(site_id, start_date, end_date, season)
+            
+    if period_df.empty: return empty_figs
+
+    meta = df.attrs.get('metadata', {})
+    d1 = meta.get('direction_1', 'Sens 1')
+    d2 = meta.get('direction_2', 'Sens 2')
+    visible = _visible_range(relayout_data)
+
+    # Resolution: the chosen one, or (auto) the one fitting the visible range
+    level = freq
+    if freq == 'A':
+        span = visible or (pd.Timestamp(start_date) if start_date else period_df['Datetime'].iloc[0].tz_localize(None),
+                           pd.Timestamp(end_date) if end_date else period_df['Datetime'].iloc[-1].tz_localize(None))
+        level = resolution_for_span(*span)
+
+    # Day and month levels are served from the daily aggregate, never from the hourly rows
+    filtered_df = _select_groups(period_df, cats, directions, d1, d2)
+    if level == 'H':
+        timeline_df = filtered_df
+    else:
+        timeline_df = _select_groups(dm.get_period(site_id, start_date, end_date, season, level='daily')[0], cats, directions, d1, d2)
+    
+    if filtered_df.empty or timeline_df.empty: return empty_figs
+    
+    freq_map = {'H': 'h', 'D': 'D', 'M': 'MS'}
+    grouper = [pd.Grouper(key='Datetime', freq=freq_map.get(level, 'D')), 'Group']
+    
+    grouped_raw = timeline_df.groupby(grouper)['Count'].sum()
+
+    if level != 'M': # if not monthly fill missing periods with 0 counts if there is data for the day
+            grouped_unstacked = grouped_raw.unstack(level='Group', fill_value=0)
+            grouped_resampled = grouped_unstacked.resample(freq_map.get(level, 'D')).asfreq()
+
+            if level == 'H':
+                active_days = grouped_unstacked.index.floor('D').unique()
+                current_days = grouped_resampled.index.floor('D')
+                mask_active_days = current_days.isin(active_days)
+                grouped_resampled.loc[mask_active_days] = grouped_resampled.loc[mask_active_days].fillna(0)
+            
+            if level == 'H':
+                # Every hour of a long range would stall the browser: keep min/max points per pixel
+                grouped = _downsample_hourly(grouped_resampled, graph_width, visible)
+            else:
+                grouped = grouped_resampled.stack(future_stack=True).reset_index(name='Count')
+            fig_time = px.line(grouped, x='Datetime', y='Count', color='Group', markers=True)
+            fig_time.update_traces(line=dict(width=2.5))
+            fig_time.update_layout(hovermode="x unified")
+    elif freq == 'M':
+            grouped = grouped_raw.reset_index(name='Count')
+            grouped = grouped.sort_values('Datetime')
+            short_months = {1: 'Jan', 2: 'Fév', 3: 'Mars', 4: 'Avr', 5: 'Mai', 6: 'Juin', 7: 'Juil', 8: 'Août', 9: 'Sept', 10: 'Oct', 11: 'Nov', 12: 'Déc'}
+            grouped['DateLabel'] = grouped['Datetime'].dt.month.map(short_months) + " " + grouped['Datetime'].dt.year.astype(str)
+            fig_time = px.bar(grouped, x='DateLabel', y='Count', color='Group', barmode='group')
+            fig_time.update_xaxes(type='category', title=None)
+    else:
+            # Auto monthly view: bars on a date axis, so that zooming in switches to days / hours
+            grouped = grouped_raw.reset_index(name='Count').sort_values('Datetime')
+            fig_time = px.bar(grouped, x='Datetime', y='Count', color='Group', barmode='group')
+            fig_time.update_traces(hovertemplate="%{x|%b %Y} : %{y} passages<extra></extra>")
+        
+    fig_time.update_layout(**COMMON_LAYOUT)
+    fig_time.update_layout(legend_title_text=None)
+    fig_time.update_yaxes(title="Volume")
+    fig_time.update_xaxes(title=None)
+    if freq == 'A':
+        fig_time.update_layout(title=f"Résolution : {RESOLUTION_LABELS[level]}")
+    
+    if relayout_data and freq != 'M':
+            if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+                fig_time.update_layout(xaxis_range=[relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']])
+            elif 'xaxis.range' in relayout_data:
+                fig_time.update_layout(xaxis_range=relayout_data['xaxis.range'])
+
+    if not with_heatmap:
+        return fig_time, None
+
+    # Heatmap
+    if 'Weekday_FR' in filtered_df.columns and 'Hour' in filtered_df.columns:
+        s_d = pd.to_datetime(start_date) if start_date else filtered_df['Datetime'].min()
+        e_d = pd.to_datetime(end_date) if end_date else filtered_df['Datetime'].max()
+        if hasattr(s_d, 'date'): s_d = s_d.date()
+        if hasattr(e_d, 'date'): e_d = e_d.date()
+
+        # Mean hourly flow: volume per weekday / hour divided by the number of such weekdays in the period
+        flow = heatmap_matrix(weekday_codes(filtered_df), filtered_df['Hour'], filtered_df['Count'], weekday_counts(s_d, e_d))
+
+        fig_hm = go.Figure(go.Heatmap(
+            z=flow, x=list(range(24)), y=DAYS_ORDER_FR, colorscale='Viridis',
+            colorbar=dict(title="V/h"),
+            hovertemplate="Jour: %{y}<br>Heure: %{x}h<br>Flux: %{z:.1f} V/h<extra></extra>"
+        ))
+        fig_hm.update_yaxes(title="Jour")
+        fig_hm.update_xaxes(title="Heure (0-23h)")
+        fig_hm.update_layout(**COMMON_LAYOUT)
+        fig_hm.update_xaxes(showgrid=False) 
+        fig_hm.update_yaxes(showgrid=False)
+    else:
+        fig_hm = px.density_heatmap(title="Données insuffisantes")
+        fig_hm.update_layout(**COMMON_LAYOUT)
+    
+    return fig_time, fig_hm
+
 # --- Layout ---
 
 def layout(site_id=None):
@@ -89,7 +325,7 @@ def layout(site_id=None):
         return dbc.Container(html.Div("Site non spécifié", className="alert alert-danger mt-5"))
         
     dm = DataManager()
-    df = dm.get_data(site_id)
+    df = dm.get_cube(site_id)
     
     if df.empty:
          return dbc.Container(html.Div(f"Pas de données trouvées pour le site: {site_id}", className="alert alert-warning mt-5"))
@@ -99,6 +335,10 @@ def layout(site_id=None):
     
     # Inject Store
     layout_content.children.insert(0, dcc.Store(id='current-site-id', data=site_id))
+    layout_content.children.insert(0, dcc.Store(id='timeline-width'))
+    # Inputs each tab was last rendered with: hidden tabs are left stale and rendered when opened
+    for store_id in ('synthesis-rendered', 'timeline-rendered', 'comparison-rendered'):
+        layout_content.children.insert(0, dcc.Store(id=store_id))
     
     # Add navigation breadcrumb
     breadcrumb = create_breadcrumb(df.attrs.get('metadata', {}).get('site_name', site_id))
@@ -127,8 +367,15 @@ def toggle_road_season_collapse(val):
     return val
 
 @callback(
-    Output("download-report", "data"),
-    Input("export-btn", "n_clicks"),
+    [Output("download-report", "data"),
+     Output("road-export-job", "data"),
+     Output("road-export-poll", "disabled"),
+     Output("road-export-progress", "value"),
+     Output("road-export-progress", "label"),
+     Output("road-export-progress", "style"),
+     Output("export-btn", "disabled")],
+    [Input("export-btn", "n_clicks"),
+     Input("road-export-poll", "n_intervals")],
     [State('road-season-switch', 'value'),
      State('road-season-start-month', 'value'),
      State('road-season-start-day', 'value'),
@@ -141,100 +388,138 @@ def toggle_road_season_collapse(val):
      State('pie-all-mobilities', 'figure'),
      State('timeline-graph', 'figure'),
      State('heatmap-day-hour', 'figure'),
-     State('current-site-id', 'data')],
+     State('synthesis-rendered', 'data'),
+     State('timeline-rendered', 'data'),
+     State('chart-freq', 'value'),
+     State('chart-cats', 'value'),
+     State('chart-directions', 'value'),
+     State('timeline-width', 'data'),
+     State('current-site-id', 'data'),
+     State("road-export-job", "data"),
+     State("road-export-progress", "style")],
     prevent_initial_call=True
 )
-def export_report(n_clicks, season_mode, sm, sd, em, ed, start, end, f1, f2, f3, f4, f5, site_id):
-    if not n_clicks or not site_id:
-        return None
-    
-    df = DataManager().get_data(site_id)
-    figures = {"Part Modale (Vélos)": f1, "Répartition Motorisée": f2, "Toutes Mobilités": f3, "Evolution Temporelle": f4, "Matrice Horaire": f5}
-    valid_figures = {k: v for k, v in figures.items() if v is not None}
-    
-    # 1. Date Range
-    report_df = filter_by_date(df, start, end)
-    
-    if season_mode:
-        # 2. Season Intersection
-        report_df, theoritical_days = filter_by_season(report_df, sm, sd, em, ed)
-        label = f"{start}_{end}_Saison_{sm:02d}-{sd:02d}_au_{em:02d}-{ed:02d}"
-    else:
-        label = f"{start}_{end}"
+def export_report(n_clicks, n_intervals, season_mode, sm, sd, em, ed, start, end, f1, f2, f3, f4, f5, synthesis_rendered, timeline_rendered,
+                  freq, cats, directions, graph_width, site_id, job_key, progress_style):
+    jobs = ReportJobs()
+    if ctx.triggered_id == "export-btn":
+        if not n_clicks or not site_id:
+            return (dash.no_update,) * 7
+        
+        # Figures of a tab not rendered since the period / season changed are stale (or were never
+        # drawn): they are rebuilt in the job, so that the report does not depend on the tabs visited
+        period = _period_key(site_id, start, end, season_mode, sm, sd, em, ed)
+        synthesis_current = synthesis_rendered == period
+        timeline_current = bool(timeline_rendered) and timeline_rendered.get('period') == period
+        shown = {}
+        if synthesis_current:
+            shown.update(zip(SYNTHESIS_FIGURES, (f1, f2, f3)))
+        if timeline_current:
+            shown.update(zip(TEMPORAL_FIGURES, (f4, f5)))
+        temporal_options = None if timeline_current else [freq, cats, directions, graph_width]
+        
+        season = (sm, sd, em, ed) if season_mode else None
+        if season_mode:
+            label = f"{start}_{end}_Saison_{sm:02d}-{sd:02d}_au_{em:02d}-{ed:02d}"
+        else:
+            label = f"{start}_{end}"
+
+        def build(progress):
+            # Date range and season intersection, shared with the dashboard callbacks
+            report_df, theoritical_days = DataManager().get_period(site_id, start, end, season)
+            figures = dict(shown)
+            if not synthesis_current:
+                progress(0, "Graphiques de synthèse")
+                figures.update(zip(SYNTHESIS_FIGURES, _synthesis_figures(report_df)))
+            if temporal_options:
+                progress(0, "Graphiques temporels")
+                figures.update(zip(TEMPORAL_FIGURES, _temporal_figures(site_id, start, end, season, *temporal_options)))
+            figures = {title: figures[title] for title in SYNTHESIS_FIGURES + TEMPORAL_FIGURES if figures.get(title) is not None}
+            return generate_html_report(report_df, figures, label, theoritical_days if season_mode else None, progress=progress)
 
+        # Identical requests (same data, period, season and figures, or inputs of the rebuilt ones) are served from the stored report
+        job_key = request_key('road', site_id, DataManager().data_signature(site_id), start, end, season, shown,
+                              not synthesis_current, temporal_options)
+        jobs.submit(job_key, f"Rapport_{site_id}_{label}.html", build)
+    elif not job_key:
+        return (dash.no_update,) * 7
 
-    report_html = generate_html_report(report_df, valid_figures, label, theoritical_days if season_mode else None)
-    return dict(content=report_html, filename=f"Rapport_{site_id}_{label}.html")
+    hidden = {**(progress_style or {}), "display": "none"}
+    status = jobs.status(job_key)
+    if status['state'] == 'done':
+        report_html = jobs.result(job_key)
+        if report_html is not None:
+            return dict(content=report_html, filename=status['filename']), None, True, 100, "", hidden, False
+    if status['state'] == 'running':
+        visible = {**(progress_style or {}), "display": "flex"}
+        return dash.no_update, job_key, False, status['progress'], f"{status['progress']} %", visible, True
+    # Failed or lost job: the button is enabled again for a retry
+    print(f"Report job {job_key} ended without result: {status['label']}")
+    return dash.no_update, None, True, 0, "", hidden, False
 
 @callback(
     [Output('synthesis-table-container', 'children'),
      Output('pie-active-share', 'figure'),
      Output('pie-motorized-split', 'figure'),
-     Output('pie-all-mobilities', 'figure')],
-    [Input('period-picker', 'start_date'),
+     Output('pie-all-mobilities', 'figure'),
+     Output('synthesis-rendered', 'data')],
+    [Input('road-tabs', 'value'),
+     Input('period-picker', 'start_date'),
      Input('period-picker', 'end_date'),
      Input('road-season-switch', 'value'),
      Input('road-season-start-month', 'value'),
      Input('road-season-start-day', 'value'),
      Input('road-season-end-month', 'value'),
      Input('road-season-end-day', 'value'),
-     Input('current-site-id', 'data')]
+     Input('current-site-id', 'data')],
+    [State('synthesis-rendered', 'data')]
 )
-def update_synthesis(start_date, end_date, season_mode, sm, sd, em, ed, site_id):
-    if not site_id:
-        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+def update_synthesis(active_tab, start_date, end_date, season_mode, sm, sd, em, ed, site_id, rendered):
+    key = _period_key(site_id, start_date, end_date, season_mode, sm, sd, em, ed)
+    # Hidden tab: left stale. Opened tab: rendered only if its inputs changed meanwhile
+    if not site_id or active_tab != 'tab-synthese' or rendered == key:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
         
-    df = DataManager().get_data(site_id)
+    df = DataManager().get_cube(site_id)
     
     if df.empty:
         no_data = px.pie(title="Aucune donnée disponible")
-        return html.Div("Pas de données."), no_data, no_data, no_data
+        return html.Div("Pas de données."), no_data, no_data, no_data, key
 
-    # 1. Filter by Date Range (First)
-    period_df = filter_by_date(df, start_date, end_date)
+    # Date range, then seasonal intersection (memoized, shared with update_timeline and export_report)
+    period_df, theoritical_days = DataManager().get_period(site_id, start_date, end_date, (sm, sd, em, ed) if season_mode else None)
     
-    # 2. Apply Seasonal Filter (Intersection)
     if season_mode:
-        period_df, theoritical_days = filter_by_season(period_df, sm, sd, em, ed)
         table = _build_synthesis_table(period_df, start_date, end_date, df.attrs.get('metadata'), is_seasonal=True, theoritical_days=theoritical_days)
     else:
         table = _build_synthesis_table(period_df, start_date, end_date, df.attrs.get('metadata'), is_seasonal=False, theoritical_days=None)
 
     if period_df.empty:
         no_data = px.pie(title="Pas de données pour cette période / saison")
-        return html.Div("Pas de données sélectionnées."), no_data, no_data, no_data
+        return html.Div("Pas de données sélectionnées."), no_data, no_data, no_data, key
 
-    # Optimized ModalGroup creation
-    period_df['ModalGroup'] = np.where(period_df['UnifiedCategory'] == 'Vélos', 'Vélos', 'Motorisé')
-    modal_counts = period_df['ModalGroup'].value_counts().reset_index()
-    modal_counts.columns = ['Type', 'Count']
-    
-    fig_pie1 = px.pie(modal_counts, names='Type', values='Count', title=None, color='Type', hole=0.4, color_discrete_map=COLOR_MAP)
-    
-    motorized_df = period_df[period_df['UnifiedCategory'].isin(['Motos', 'VL', 'PL'])]
-    if not motorized_df.empty:
-        mot_counts = motorized_df['UnifiedCategory'].value_counts().reset_index()
-        mot_counts.columns = ['Cat', 'Count']
-        fig_pie2 = px.pie(mot_counts, names='Cat', values='Count', title=None, color='Cat', hole=0.4, color_discrete_map=COLOR_MAP)
-    else:
-        fig_pie2 = px.pie(title="Pas de trafic motorisé")
-        
-    all_counts = period_df['UnifiedCategory'].value_counts().reset_index()
-    all_counts.columns = ['Cat', 'Count']
-    fig_pie3 = px.pie(all_counts, names='Cat', values='Count', title=None, color='Cat', hole=0.4, color_discrete_map=COLOR_MAP)
-    
-    for fig in [fig_pie1, fig_pie2, fig_pie3]:
-        fig.update_layout(**COMMON_LAYOUT)
-        fig.update_traces(textinfo='percent+label', textposition='outside', marker=dict(line=dict(color='#FFFFFF', width=2)))
-        fig.update_xaxes(showgrid=False, zeroline=False, showticklabels=False)
-        fig.update_yaxes(showgrid=False, zeroline=False, showticklabels=False)
+    fig_pie1, fig_pie2, fig_pie3 = _synthesis_figures(period_df)
+    return table, fig_pie1, fig_pie2, fig_pie3, key
 
-    return table, fig_pie1, fig_pie2, fig_pie3
+# Pixel width of the timeline graph, sizes the downsampling of the hourly curve
+clientside_callback(
+    """
+    function(siteId, activeTab) {
+        var graph = document.getElementById('timeline-graph');
+        return graph && graph.offsetWidth ? graph.offsetWidth : null;
+    }
+    """,
+    Output('timeline-width', 'data'),
+    [Input('current-site-id', 'data'),
+     Input('road-tabs', 'value')]
+)
 
 @callback(
     [Output('timeline-graph', 'figure'),
-     Output('heatmap-day-hour', 'figure')],
-    [Input('period-picker', 'start_date'),
+     Output('heatmap-day-hour', 'figure'),
+     Output('timeline-rendered', 'data')],
+    [Input('road-tabs', 'value'),
+     Input('period-picker', 'start_date'),
      Input('period-picker', 'end_date'),
      Input('road-season-switch', 'value'),
      Input('road-season-start-month', 'value'),
@@ -244,154 +529,51 @@ def update_synthesis(start_date, end_date, season_mode, sm, sd, em, ed, site_id)
      Input('chart-freq', 'value'),
      Input('chart-cats', 'value'),
      Input('chart-directions', 'value'),
-     Input('current-site-id', 'data')],
-    [State('timeline-graph', 'relayoutData')]
+     Input('current-site-id', 'data'),
+     Input('timeline-width', 'data'),
+     Input('timeline-graph', 'relayoutData')],
+    [State('timeline-rendered', 'data')]
 )
-def update_timeline(start_date, end_date, season_mode, sm, sd, em, ed, freq, cats, directions, site_id, relayout_data):
-    if not site_id: return dash.no_update, dash.no_update
-    
-    df = DataManager().get_data(site_id)
-    empty_figs = (px.line(title="Pas de données"), px.density_heatmap(title="Pas de données"))
-    
-    if df.empty: return empty_figs
-        
-    period_df = filter_by_date(df, start_date, end_date)
-    if season_mode:
-        period_df, _ = filter_by_season(period_df, sm, sd, em, ed)
-            
-    if period_df.empty: return empty_figs
-
-    cats = cats or []
-    directions = directions or []
-    
-    # Fast filtering with isin for categories
-    filtered_df = period_df[period_df['UnifiedCategory'].isin(cats)]
-    
-    # Optimized Direction Filtering
-    # Convert to string once for vectorization
-    if 'Direction' in filtered_df.columns:
-        dir_series = filtered_df['Direction'].astype(str)
-        # Create a boolean mask for all selected directions
-        if directions:
-             # Fast regex-style OR matching or simple isin if values are exact
-             # Given '1' and '2' are substrings in complex strings sometimes, we check containment
-             # But here values are likely "1" or "2" or "Voie 1" etc.
-             # Using list comp with reduce is safer for arbitrary substrings but 'str.contains' with regex is faster
-             pattern = '|'.join([re.escape(d) for d in directions])
-             if pattern:
-                filtered_df = filtered_df[dir_series.str.contains(pattern, regex=True)]
-    
-    if filtered_df.empty: return empty_figs
-            
-    meta = df.attrs.get('metadata', {})
-    d1 = meta.get('direction_1', 'Sens 1')
-    d2 = meta.get('direction_2', 'Sens 2')
-
-    # Optimized SensLabel with numpy select
-    # Re-eval series on filtered data
-    d_series = filtered_df['Direction'].astype(str)
-    cond1 = d_series.str.contains('1')
-    cond2 = d_series.str.contains('2')
-    
-    filtered_df['SensLabel'] = np.select(
-        [cond1, cond2],
-        [d1, d2],
-        default='Inconnu'
-    )
-    filtered_df['Group'] = filtered_df['UnifiedCategory'] + " - " + filtered_df['SensLabel']
-    
-    freq_map = {'H': 'h', 'D': 'D', 'M': 'MS'}
-    grouper = [pd.Grouper(key='Datetime', freq=freq_map.get(freq, 'D')), 'Group']
-    
-    grouped_raw = filtered_df.groupby(grouper).size()
-
-    if freq != 'M': # if not monthly fill missing periods with 0 counts if there is data for the day
-            grouped_unstacked = grouped_raw.unstack(level='Group', fill_value=0)
-            grouped_resampled = grouped_unstacked.resample(freq_map.get(freq, 'D')).asfreq()
-
-            if freq == 'H':
-                active_days = grouped_unstacked.index.floor('D').unique()
-                current_days = grouped_resampled.index.floor('D')
-                mask_active_days = current_days.isin(active_days)
-                grouped_resampled.loc[mask_active_days] = grouped_resampled.loc[mask_active_days].fillna(0)
-            
-            grouped = grouped_resampled.stack(future_stack=True).reset_index(name='Count')
-            fig_time = px.line(grouped, x='Datetime', y='Count', color='Group', markers=True)
-            fig_time.update_traces(line=dict(width=2.5))
-            fig_time.update_layout(hovermode="x unified")
-    else:
-            grouped = grouped_raw.reset_index(name='Count')
-            grouped = grouped.sort_values('Datetime')
-            short_months = {1: 'Jan', 2: 'Fév', 3: 'Mars', 4: 'Avr', 5: 'Mai', 6: 'Juin', 7: 'Juil', 8: 'Août', 9: 'Sept', 10: 'Oct', 11: 'Nov', 12: 'Déc'}
-            grouped['DateLabel'] = grouped['Datetime'].dt.month.map(short_months) + " " + grouped['Datetime'].dt.year.astype(str)
-            fig_time = px.bar(grouped, x='DateLabel', y='Count', color='Group', barmode='group')
-            fig_time.update_xaxes(type='category', title=None)
-        
-    fig_time.update_layout(**COMMON_LAYOUT)
-    fig_time.update_layout(legend_title_text=None)
-    fig_time.update_yaxes(title="Volume")
-    fig_time.update_xaxes(title=None)
+def update_timeline(active_tab, start_date, end_date, season_mode, sm, sd, em, ed, freq, cats, directions, site_id, graph_width, relayout_data, rendered):
+    key = {'period': _period_key(site_id, start_date, end_date, season_mode, sm, sd, em, ed), 'options': [freq, cats, directions, graph_width]}
+    # Zoom / pan: only the timeline depends on the visible range (downsampled hourly curve, auto resolution)
+    zoom_only = ctx.triggered_id == 'timeline-graph'
+    # Hidden tab: left stale. Opened tab: rendered only if its inputs changed meanwhile
+    if not site_id or active_tab != 'tab-temporal' or (rendered == key and not zoom_only):
+        return dash.no_update, dash.no_update, dash.no_update
+    if zoom_only and (freq not in ('H', 'A') or not relayout_data or not any(k.startswith('xaxis.') for k in relayout_data)):
+        return dash.no_update, dash.no_update, dash.no_update
     
     trigger_id = ctx.triggered_id
-    if relayout_data and freq != 'M' and (not trigger_id or 'period-picker' not in trigger_id):
-            if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
-                fig_time.update_layout(xaxis_range=[relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']])
-            elif 'xaxis.range' in relayout_data:
-                fig_time.update_layout(xaxis_range=relayout_data['xaxis.range'])
-
-    # Heatmap
-    if 'Weekday_FR' in filtered_df.columns and 'Hour' in filtered_df.columns:
-        heatmap_data = filtered_df.groupby(['Weekday_FR', 'Hour']).size().reset_index(name='TotalVolume')
-        s_d = pd.to_datetime(start_date) if start_date else filtered_df['Datetime'].min()
-        e_d = pd.to_datetime(end_date) if end_date else filtered_df['Datetime'].max()
-        if hasattr(s_d, 'date'): s_d = s_d.date()
-        if hasattr(e_d, 'date'): e_d = e_d.date()
-
-        full_date_range = pd.date_range(start=s_d, end=e_d, freq='D')
-        ref_days = pd.DataFrame({'Date': full_date_range})
-        fr_map = {'Monday': 'Lundi', 'Tuesday': 'Mardi', 'Wednesday': 'Mercredi', 'Thursday': 'Jeudi', 'Friday': 'Vendredi', 'Saturday': 'Samedi', 'Sunday': 'Dimanche'}
-        ref_days['Weekday_FR'] = ref_days['Date'].dt.day_name().map(fr_map)
-        day_counts = ref_days['Weekday_FR'].value_counts().reset_index()
-        day_counts.columns = ['Weekday_FR', 'NbDays']
-        
-        heatmap_data = pd.merge(heatmap_data, day_counts, on='Weekday_FR', how='left')
-        heatmap_data['Flow'] = heatmap_data['TotalVolume'] / heatmap_data['NbDays']
-        
-        fig_hm = px.density_heatmap(heatmap_data, x='Hour', y='Weekday_FR', z='Flow', category_orders={'Weekday_FR': DAYS_ORDER_FR}, color_continuous_scale='Viridis', nbinsx=24)
-        fig_hm.update_yaxes(title="Jour")
-        fig_hm.update_xaxes(title="Heure (0-23h)")
-        fig_hm.update_coloraxes(colorbar_title="V/h")
-        fig_hm.update_layout(**COMMON_LAYOUT)
-        fig_hm.update_xaxes(showgrid=False) 
-        fig_hm.update_yaxes(showgrid=False)
-    else:
-        fig_hm = px.density_heatmap(title="Données insuffisantes")
-        fig_hm.update_layout(**COMMON_LAYOUT)
-    
-    return fig_time, fig_hm
+    # A new date range drops the zoom, also when it was picked while the tab was hidden
+    new_range = (trigger_id and 'period-picker' in trigger_id) or (trigger_id == 'road-tabs' and (not rendered or rendered['period'][1:3] != key['period'][1:3]))
+    season = (sm, sd, em, ed) if season_mode else None
+    fig_time, fig_hm = _temporal_figures(site_id, start_date, end_date, season, freq, cats, directions, graph_width,
+                                         None if new_range else relayout_data, with_heatmap=not zoom_only)
+    if zoom_only:
+        return fig_time, dash.no_update, dash.no_update
+    return fig_time, fig_hm, key
 
 @callback(
     [Output('annual-evolution-bar', 'figure'),
-     Output('annual-seasonality-line', 'figure')],
-    [Input('comp-cats', 'value'),
-     Input('current-site-id', 'data')]
+     Output('annual-seasonality-line', 'figure'),
+     Output('comparison-rendered', 'data')],
+    [Input('road-tabs', 'value'),
+     Input('comp-cats', 'value'),
+     Input('current-site-id', 'data')],
+    [State('comparison-rendered', 'data')]
 )
-def update_comparison(cats, site_id):
-    if not site_id: return dash.no_update, dash.no_update
-    df = DataManager().get_data(site_id)
-    empty_figs = (px.bar(title="Pas de données"), px.line(title="Pas de données"))
-    if df.empty: return empty_figs
+def update_comparison(active_tab, cats, site_id, rendered):
+    key = [site_id, cats]
+    # Hidden tab: left stale. Opened tab: rendered only if its inputs changed meanwhile
+    if not site_id or active_tab != 'tab-annual' or rendered == key:
+        return dash.no_update, dash.no_update, dash.no_update
+    empty_figs = (px.bar(title="Pas de données"), px.line(title="Pas de données"), key)
         
-    cats = cats or []
-    comp_df = df[df['UnifiedCategory'].isin(cats)].copy()
+    # Yearly / monthly volumes and active days, precomputed per site and cached per category set
+    annual_group, monthly_group = DataManager().get_comparison(site_id, cats or [])
     
-    if comp_df.empty: return empty_figs
-
-    annual_vols = comp_df.groupby(['Year', 'UnifiedCategory'], observed=True).size().reset_index(name='Volume')
-    days_per_year = comp_df.groupby('Year', observed=True)['Date'].nunique().reset_index(name='NbDays')
-    
-    annual_group = pd.merge(annual_vols, days_per_year, on='Year')
-    annual_group['TMJ'] = (annual_group['Volume'] / annual_group['NbDays']).round(0)
+    if annual_group.empty: return empty_figs
     
     fig_bar = px.bar(annual_group, x='Year', y='TMJ', color='UnifiedCategory', barmode='group', color_discrete_map=COLOR_MAP, text='TMJ')
     fig_bar.update_traces(textposition='outside')
@@ -400,12 +582,7 @@ def update_comparison(cats, site_id):
     fig_bar.update_xaxes(title=None, dtick=1)
     fig_bar.update_layout(legend_title_text=None)
     
-    monthly_vols = comp_df.groupby(['Year', 'Month'], observed=True).size().reset_index(name='Volume')
-    days_per_month = comp_df.groupby(['Year', 'Month'], observed=True)['Date'].nunique().reset_index(name='NbDays')
-    
-    monthly_group = pd.merge(monthly_vols, days_per_month, on=['Year', 'Month'])
-    monthly_group['TMJ_Month'] = (monthly_group['Volume'] / monthly_group['NbDays']).round(0)
-    monthly_group['MonthName'] = monthly_group['Month'].map(FRENCH_MONTHS_MAP)
+    monthly_group = monthly_group.assign(MonthName=monthly_group['Month'].map(FRENCH_MONTHS_MAP))
     
     fig_line = px.line(monthly_group, x='MonthName', y='TMJ_Month', color='Year', markers=True, category_orders={'MonthName': list(FRENCH_MONTHS_MAP.values())})
     fig_line.update_layout(**COMMON_LAYOUT)
@@ -414,4 +591,4 @@ def update_comparison(cats, site_id):
     fig_line.update_xaxes(title=None)
     fig_line.update_layout(legend_title_text="Année")
     
-    return fig_bar, fig_line
+    return fig_bar, fig_line, key
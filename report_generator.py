@@ -1,7 +1,16 @@
+import hashlib
 import pandas as pd
 import plotly.io as pio
 import plotly.graph_objects as go
-from utils import compute_metrics
+from cache import LRUCache
+from utils import SYNTHESIS_CATEGORIES, PEDESTRIAN_INDICATORS, compute_pedestrian_metrics, compute_synthesis, day_types, pedestrian_day_counts
+
+# Memory budget (MB) of the HTML fragments of exported figures, cached by a hash of their content
+FIGURE_CACHE_MB = 64
+_figure_cache = LRUCache(max_bytes=FIGURE_CACHE_MB * 1024 * 1024)
+
+# Div id of a cached fragment, replaced by an id unique to its position in the report
+FIGURE_DIV_ID = "report-figure"
 
 # Helper for basic metrics
 
@@ -15,13 +24,13 @@ def _generate_table_html(df, theoritical_days=None):
     
     # Calculate days stats based on the data present
     if 'Date' not in df.columns:
-        df['Date'] = df['Datetime'].dt.date
+        # The frame may be shared with the dashboard callbacks, it is not modified
+        df = df.assign(Date=df['Datetime'].dt.tz_localize(None).dt.normalize())
         
     dates = df['Date'].unique()
     dates_df = pd.DataFrame({'Date': dates})
     dates_df['Date'] = pd.to_datetime(dates_df['Date'])
-    dates_df['DayName'] = dates_df['Date'].dt.day_name()
-    dates_df['IsWE'] = dates_df['DayName'].isin(['Saturday', 'Sunday'])
+    dates_df['IsWE'] = day_types(dates_df['Date']) == 'WE'  # public holidays count as WE
     
     if theoritical_days is None: 
         nb_days_total = len(dates_df)
@@ -32,7 +41,8 @@ def _generate_table_html(df, theoritical_days=None):
         nb_days_jo = theoritical_days['nb_JO_days']
         nb_days_we = theoritical_days['nb_WE_days']
         
-    categories = ['Vélos', 'Motos', 'VL', 'PL']
+    categories = SYNTHESIS_CATEGORIES
+    synthesis = compute_synthesis(df, nb_days_total, nb_days_jo, nb_days_we, categories)
     
     # Build Rows HTML
     rows_html = ""
@@ -40,10 +50,7 @@ def _generate_table_html(df, theoritical_days=None):
     def make_cells_html(label, filter_cat=None):
         row_str = f"<tr><td style='font-weight:bold;'>{label}</td>"
         for sens_code in ['1', '2']:
-            d_data = df[df['Direction'].astype(str).str.contains(sens_code)]
-            if filter_cat:
-                d_data = d_data[d_data['UnifiedCategory'] == filter_cat]
-            m = compute_metrics(d_data, nb_days_total, nb_days_jo, nb_days_we)
+            m = synthesis[(filter_cat, sens_code)]
             for val in m:
                 formatted = val if isinstance(val, str) else f"{val:,}".replace(",", " ")
                 css_class = ""
@@ -80,35 +87,106 @@ def _generate_table_html(df, theoritical_days=None):
     """
     return table_html
 
-def generate_html_report(df, figures, label, theoretical_days=None):
+def _pedestrian_table_html(daily, theoretical_days=None, start_date=None, end_date=None, is_seasonal=False):
+    """
+    Pedestrian indicators (see utils.compute_pedestrian_metrics) of a slice of the daily totals table.
+    """
+    if daily.empty:
+        return "<p class='text-muted'>Pas de données pour la table.</p>"
+    
+    metrics = compute_pedestrian_metrics(daily, *pedestrian_day_counts(daily, start_date, end_date, is_seasonal))
+    rows_html = "".join(f"<tr><td style='font-weight:bold;'>{label}</td><td class='text-end'>{value}</td></tr>"
+                        for label, value in zip(PEDESTRIAN_INDICATORS, metrics))
+    return f"""
+    <div class="table-responsive">
+    <table class="table table-bordered table-hover table-sm mb-0">
+        <tbody>
+            {rows_html}
+        </tbody>
+    </table>
+    </div>
+    """
+
+# Title, synthesis table builder and lexicon (two columns of terms) of the report of each kind of counter.
+# A table builder is called as builder(df, theoretical_days, **table_args) and returns HTML.
+REPORT_KINDS = {
+    'road': {
+        'title': "RAPPORT DE TRAFIC",
+        'table': _generate_table_html,
+        'lexicon': [
+            [("TMJ", "Trafic Moyen Journalier (Moyenne quotidienne)."),
+             ("TMJ JO", "Moyenne des Jours Ouvrés (Lun-Ven, hors jours fériés)."),
+             ("TMJ WE", "Moyenne des Week-ends (Sam-Dim) et jours fériés.")],
+            [("VL", "Véhicules Légers (Voitures < 3.5t)."),
+             ("PL", "Poids Lourds (> 3.5t)."),
+             ("VT", "Vitesse Moyenne (si disponible).")],
+        ],
+    },
+    'pedestrian': {
+        'title': "RAPPORT DE FRÉQUENTATION",
+        'table': _pedestrian_table_html,
+        'lexicon': [
+            [("FMJ", "Fréquentation Moyenne Journalière."),
+             ("JO", "Moyenne des Jours Ouvrés (Lun-Ven).")],
+            [("WE", "Moyenne des Week-ends (Sam-Dim)."),
+             ("Pic", "Jour de plus forte fréquentation de la période.")],
+        ],
+    },
+}
+
+def _figure_html(fig):
+    """
+    Responsive Plotly HTML div of a figure (Figure, or dict from a Dash state), with FIGURE_DIV_ID
+    as div id. Cached by a hash of its JSON (unvalidated, far cheaper than to_html): exporting the
+    same view again skips the serialization.
+    """
+    key = hashlib.sha256(pio.to_json(fig, validate=False).encode('utf-8')).hexdigest()
+    cached = _figure_cache.get(key)
+    if cached is not None:
+        return cached
+    # Handle dictionary figures (from Dash state)
+    if isinstance(fig, dict):
+        fig = go.Figure(fig)
+    plot_html = pio.to_html(fig, full_html=False, include_plotlyjs='cdn', config={'responsive': True}, div_id=FIGURE_DIV_ID)
+    return _figure_cache.put(key, plot_html)
+
+def generate_html_report(df, figures, label, theoretical_days=None, progress=None, kind='road', **table_args):
     """
     Generates a standalone HTML report with logo, stats table, and figures.
+    kind selects the title, synthesis table and lexicon in REPORT_KINDS; table_args are passed to its table builder.
+    progress(fraction, label), if given, is called as the table and each figure are rendered.
     """
+    report = REPORT_KINDS[kind]
     meta = df.attrs.get('metadata', {})
     site_name = meta.get('site_name', 'Inconnu')
     logo_url = "https://media.mercantour.eu/logos/logo_auto-productions_pnm_quadri_txt_vert.png"
     
+    figures = {title: fig for title, fig in figures.items() if fig}
+    nb_steps = len(figures) + 1
+
     # Generate Table
-    table_html = _generate_table_html(df, theoretical_days)
+    if progress: progress(0, "Tableau de synthèse")
+    table_html = report['table'](df, theoretical_days, **table_args)
     
     # Generate Charts HTML
     charts_html = ""
-    for title, fig in figures.items():
-        if fig:
-            # Handle dictionary figures (from Dash state)
-            if isinstance(fig, dict):
-                fig = go.Figure(fig)
-            
-            # Use responsive Plotly HTML div
-            plot_html = pio.to_html(fig, full_html=False, include_plotlyjs='cdn', config={'responsive': True})
-            charts_html += f"""
-            <div class="card mb-5 page-break">
-                <div class="card-header bg-white fw-bold border-bottom-0 py-3">{title}</div>
-                <div class="card-body p-1">
-                    {plot_html}
-                </div>
+    for step, (title, fig) in enumerate(figures.items(), start=1):
+        if progress: progress(step / nb_steps, f"Graphique : {title}")
+        plot_html = _figure_html(fig).replace(f'"{FIGURE_DIV_ID}"', f'"{FIGURE_DIV_ID}-{step}"')
+        charts_html += f"""
+        <div class="card mb-5 page-break">
+            <div class="card-header bg-white fw-bold border-bottom-0 py-3">{title}</div>
+            <div class="card-body p-1">
+                {plot_html}
             </div>
-            """
+        </div>
+        """
+
+    lexicon_html = "".join(
+        '<div class="col-md-6"><ul class="list-unstyled mb-0 small">'
+        + "".join(f'<li class="mb-2"><strong class="text-primary">{term}</strong> : {definition}</li>' for term, definition in column)
+        + '</ul></div>'
+        for column in report['lexicon'])
 
     # Assemble Full HTML
     html_content = f"""
@@ -150,7 +228,7 @@ def generate_html_report(df, figures, label, theoretical_days=None):
             <div class="header-container d-flex align-items-center justify-content-between">
                 <img src="{logo_url}" alt="Logo Mercantour" class="logo-img">
                 <div class="text-center flex-grow-1 mx-4">
-                     <h1 class="report-title">RAPPORT DE TRAFIC</h1>
+                     <h1 class="report-title">{report['title']}</h1>
                      <h2 class="h5 text-muted text-uppercase mb-2">{site_name}</h2>
                      <p class="report-subtitle mb-0 badge bg-light text-dark border">Période : {label}</p>
                 </div>
@@ -179,20 +257,7 @@ def generate_html_report(df, figures, label, theoretical_days=None):
                  <div class="card bg-light border-0">
                     <div class="card-body">
                         <div class="row">
-                            <div class="col-md-6">
-                                <ul class="list-unstyled mb-0 small">
-                                    <li class="mb-2"><strong class="text-primary">TMJ</strong> : Trafic Moyen Journalier (Moyenne quotidienne).</li>
-                                    <li class="mb-2"><strong class="text-primary">TMJ JO</strong> : Moyenne des Jours Ouvrés (Lun-Ven).</li>
-                                    <li class="mb-2"><strong class="text-primary">TMJ WE</strong> : Moyenne des Week-ends (Sam-Dim).</li>
-                                </ul>
-                            </div>
-                            <div class="col-md-6">
-                                <ul class="list-unstyled mb-0 small">
-                                    <li class="mb-2"><strong class="text-primary">VL</strong> : Véhicules Légers (Voitures < 3.5t).</li>
-                                    <li class="mb-2"><strong class="text-primary">PL</strong> : Poids Lourds (> 3.5t).</li>
-                                    <li class="mb-2"><strong class="text-primary">VT</strong> : Vitesse Moyenne (si disponible).</li>
-                                </ul>
-                            </div>
+                            {lexicon_html}
                         </div>
                     </div>
                  </div>
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Report builds running at the same time in each process
+REPORT_WORKERS = int(os.environ.get('DASHBOARD_REPORT_WORKERS', 2))
+
+# Finished reports kept on disk, the oldest ones are deleted beyond
+REPORT_CACHE_ENTRIES = 32
+
+# A running job without progress for that long is considered lost (e.g. its worker was restarted)
+REPORT_JOB_TIMEOUT = 10 * 60
+
+def request_key(*parts):
+    """
+    Hash identifying a report request (site, data signature, period, season, figures...).
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+class ReportJobs:
+    """
+    Builds reports in a background thread pool so that the Dash request returns at once.
+    Jobs are identified by their request_key. Their state and the finished reports are files of
+    data/report_cache (<key>.json / <key>.html): any gunicorn worker can answer the polling of a
+    job started by another one, and an identical request is served from the stored report.
+    """
+    _instance = None
+    _executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report')
+    _directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "report_cache")
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ReportJobs, cls).__new__(cls)
+        return cls._instance
+
+    def _path(self, key, ext):
+        return os.path.join(self._directory, f"{key}.{ext}")
+
+    def submit(self, key, filename, build):
+        """
+        Starts build(progress) -> html in the pool, unless the report is already stored or being built.
+        progress(fraction, label) reports the advancement of the build.
+        """
+        state = self.status(key)
+        if state['state'] in ('done', 'running'):
+            return state
+        os.makedirs(self._directory, exist_ok=True)
+        self._set_status(key, 'running', 0, "En attente", filename)
+        self._executor.submit(self._run, key, filename, build)
+        return self.status(key)
+
+    def status(self, key):
+        """
+        {'state': 'missing' | 'running' | 'done' | 'error', 'progress': 0-100, 'label': str, 'filename': str}
+        """
+        try:
+            with open(self._path(key, 'json'), encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {'state': 'missing', 'progress': 0, 'label': "", 'filename': None}
+        if state['state'] == 'done' and not os.path.exists(self._path(key, 'html')):
+            state['state'] = 'missing'
+        elif state['state'] == 'running' and time.time() - state['updated'] > REPORT_JOB_TIMEOUT:
+            state['state'], state['label'] = 'error', "Génération interrompue"
+        return state
+
+    def result(self, key):
+        """
+        HTML of a finished report, None if it is not (or no longer) stored.
+        """
+        try:
+            with open(self._path(key, 'html'), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _set_status(self, key, state, progress, label, filename):
+        status = {'state': state, 'progress': int(progress), 'label': label, 'filename': filename, 'updated': time.time()}
+        _write_atomic(self._path(key, 'json'), json.dumps(status))
+
+    def _run(self, key, filename, build):
+        def progress(fraction, label):
+            self._set_status(key, 'running', 100 * fraction, label, filename)
+        try:
+            html = build(progress)
+            _write_atomic(self._path(key, 'html'), html)
+            self._set_status(key, 'done', 100, "Terminé", filename)
+            self._prune()
+        except Exception as e:
+            print(f"Error building report {filename}: {e}")
+            traceback.print_exc()
+            self._set_status(key, 'error', 0, "Erreur lors de la génération", filename)
+
+    def _prune(self):
+        """
+        Keeps the REPORT_CACHE_ENTRIES most recent reports.
+        """
+        try:
+            reports = [e for e in os.scandir(self._directory) if e.name.endswith('.html')]
+        except OSError:
+            return
+        reports.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in reports[REPORT_CACHE_ENTRIES:]:
+            key = entry.name[:-len('.html')]
+            for ext in ('html', 'json'):
+                try:
+                    os.remove(self._path(key, ext))
+                except OSError:
+                    pass
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import PROFILE_SMOOTHING_DAYS, build_annual_profiles, build_daily_totals
+from utils import TZ, centered_rolling_mean
+
+def _reference(records):
+    """
+    Reference: the per-year groupby and rolling transform that build_annual_profiles replaced,
+    as {(year, day of year): (count, smoothed count)}.
+    """
+    df = records.assign(Year=records['Datetime'].dt.year, DOY=records['Datetime'].dt.dayofyear)
+    daily = df.groupby(['Year', 'DOY'])['Count'].sum().reset_index()
+    daily['Count_Smooth'] = daily.groupby('Year')['Count'].transform(
+        lambda x: x.rolling(PROFILE_SMOOTHING_DAYS, min_periods=1, center=True).mean())
+    return {(row.Year, row.DOY): (row.Count, row.Count_Smooth) for row in daily.itertuples()}
+
+def _records(start, end, seed):
+    rng = np.random.default_rng(seed)
+    hours = pd.date_range(pd.Timestamp(start, tz=TZ), pd.Timestamp(end, tz=TZ), freq='h', inclusive='left')
+    return pd.DataFrame({'Datetime': hours, 'Count': rng.poisson(4, len(hours)).astype(float)})
+
+@pytest.mark.parametrize('window', [1, 4, 5, 7])
+def test_centered_rolling_mean(window):
+    rng = np.random.default_rng(window)
+    matrix = rng.random((4, 60))
+    matrix[rng.random(matrix.shape) < 0.2] = np.nan
+    matrix[2, :] = np.nan
+    expected = pd.DataFrame(matrix).T.rolling(window, center=True, min_periods=1).mean().T.to_numpy()
+    np.testing.assert_allclose(centered_rolling_mean(matrix, window), expected)
+
+def test_matrix_matches_previous_ridgeline():
+    # Whole years without gaps, one of them a leap year
+    records = _records('2023-01-01', '2025-01-01', seed=0)
+    profiles = build_annual_profiles(build_daily_totals(records))
+    expected = _reference(records)
+    assert list(profiles['years']) == [2023, 2024]
+    present = ~np.isnan(profiles['counts'])
+    assert present.sum() == len(expected)
+    for row, year in enumerate(profiles['years']):
+        for column in np.flatnonzero(present[row]):
+            count, smooth = expected[(year, column + 1)]
+            assert profiles['counts'][row, column] == count
+            assert profiles['smooth'][row, column] == pytest.approx(smooth)
+
+def test_missing_days_are_calendar_days():
+    # A gap in the data: the smoothing window spans the missing days instead of skipping them
+    records = _records('2023-05-01', '2023-07-01', seed=1)
+    records = records[(records['Datetime'] < pd.Timestamp('2023-06-01', tz=TZ)) |
+                      (records['Datetime'] >= pd.Timestamp('2023-06-04', tz=TZ))]
+    profiles = build_annual_profiles(build_daily_totals(records))
+    counts = pd.Series(profiles['counts'][0])
+    assert counts.iloc[151:154].isna().all()
+    expected = counts.rolling(PROFILE_SMOOTHING_DAYS, center=True, min_periods=1).mean().to_numpy()
+    np.testing.assert_allclose(profiles['smooth'][0], expected)
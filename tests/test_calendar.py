@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+from data_loader import DataManager, build_hourly_cube, enforce_schema
+from utils import TZ, calendar_table, day_types, filter_by_date, filter_by_season, french_holidays
+
+def _reference_days(first, last, season):
+    """
+    Reference: the days of the season between two days, counted one by one (all, JO, WE),
+    public holidays counted as WE.
+    """
+    sm, sd, em, ed = season
+    holidays = {h for year in range(first.year, last.year + 1) for h in french_holidays(year)}
+    total = jo = we = 0
+    for day in pd.date_range(first, last, freq='D'):
+        md = day.month * 100 + day.day
+        inside = sm * 100 + sd <= md <= em * 100 + ed if sm * 100 + sd <= em * 100 + ed else \
+            md >= sm * 100 + sd or md <= em * 100 + ed
+        if not inside:
+            continue
+        total += 1
+        if day.dayofweek >= 5 or day in holidays:
+            we += 1
+        else:
+            jo += 1
+    return {'nb_full_days': total, 'nb_JO_days': jo, 'nb_WE_days': we}
+
+@pytest.fixture(scope='module')
+def cube():
+    """
+    Hourly cube of per-vehicle rows over two years and a half.
+    """
+    rng = np.random.default_rng(0)
+    n = 30000
+    start = pd.Timestamp('2023-01-01', tz=TZ)
+    seconds = np.sort(rng.integers(0, 900 * 86400, n))
+    passages = pd.DataFrame({
+        'Datetime': start + pd.to_timedelta(seconds, unit='s'),
+        'Direction': rng.choice(['1', '2'], n),
+        'UnifiedCategory': rng.choice(['VL', 'PL'], n),
+        'Speed': rng.normal(60, 15, n).round(1),
+    })
+    return enforce_schema(build_hourly_cube(passages))
+
+def test_holidays_2024():
+    # Easter Sunday 2024 is March 31
+    holidays = [h.strftime('%m-%d') for h in french_holidays(2024)]
+    assert holidays == ['01-01', '04-01', '05-01', '05-08', '05-09', '05-20', '07-14', '08-15', '11-01', '11-11', '12-25']
+
+def test_day_types():
+    days = pd.Series(pd.to_datetime(['2024-05-08', '2024-05-10', '2024-05-11', '2024-12-25', '2024-12-26']))
+    assert list(day_types(days)) == ['WE', 'JO', 'WE', 'WE', 'JO']
+    table = calendar_table(pd.Timestamp('2024-05-06'), pd.Timestamp('2024-05-12'))
+    assert list(table['IsHoliday']) == [False, False, True, True, False, False, False]
+    assert list(table['IsWE']) == [False] * 5 + [True] * 2
+    assert list(table['DayType']) == ['JO', 'JO', 'WE', 'WE', 'JO', 'WE', 'WE']
+
+def test_cube_day_types(cube):
+    # Rows and day counts share the rule: holidays are WE in the DayType of the rows
+    holidays = cube['Date'].isin(french_holidays(2023) + french_holidays(2024) + french_holidays(2025))
+    assert (cube.loc[holidays, 'DayType'] == 'WE').all()
+    assert (cube.loc[~holidays, 'DayType'] == np.where(cube.loc[~holidays, 'Datetime'].dt.dayofweek >= 5, 'WE', 'JO')).all()
+
+@pytest.mark.parametrize('season', [(5, 1, 5, 31), (11, 15, 2, 15), (7, 14, 7, 14)])
+def test_season_days(cube, season):
+    first = cube['Date'].min()
+    last = cube['Date'].max()
+    expected = _reference_days(first, last, season)
+    # Calendar built for the frame, or sliced from the calendar of a longer span
+    assert filter_by_season(cube, *season)[1] == expected
+    site_calendar = calendar_table(first - pd.Timedelta(days=40), last + pd.Timedelta(days=40))
+    assert filter_by_season(cube, *season, calendar=site_calendar)[1] == expected
+
+def test_one_calendar_per_site(cube, monkeypatch):
+    built = []
+    def counted(first_day, last_day):
+        built.append((first_day, last_day))
+        return calendar_table(first_day, last_day)
+    monkeypatch.setattr(data_loader, 'calendar_table', counted)
+    monkeypatch.setattr(DataManager, 'get_cube', lambda self, site_id: cube)
+    monkeypatch.setattr(DataManager, '_cube_signature', lambda self, site_id: ('cube', 'raw'))
+    dm = DataManager()
+    dm.invalidate()
+    try:
+        for start, end, season in [('2023-03-01', '2023-09-30', (5, 1, 5, 31)),
+                                   ('2024-01-01', '2025-06-01', (11, 15, 2, 15)),
+                                   (None, None, (7, 14, 7, 14))]:
+            dated = filter_by_date(cube, start, end)
+            period, days = dm.get_period('col', start, end, season)
+            assert days == _reference_days(dated['Date'].min(), dated['Date'].max(), season)
+        assert built == [(cube['Date'].min(), cube['Date'].max())]
+    finally:
+        dm.invalidate()
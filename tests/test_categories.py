@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import unify_categories
+
+def _get_unified_category(row):
+    """
+    Reference: the row-wise mapping that unify_categories replaced, kept as is.
+    """
+    cat = str(row.get('Category', '')).lower()
+    siredo = row.get('Category_SIREDO')
+
+    # Robust check for 'Vélo' including potential encoding artifacts (Vï¿½lo, etc)
+    if any(x in cat for x in ['vélo', 'velo', 'vï¿½lo', 'vlo']):
+        return 'Vélos'
+    elif cat == 'moto':
+        return 'Motos'
+    elif siredo in [1, 12] or (cat == 'u3' and pd.isna(siredo)):
+        return 'VL'
+    elif siredo in [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 14]:
+        return 'PL'
+    return 'Autre'
+
+LABELS = ['Vélo', 'VELO', 'Vï¿½lo', 'vlo', 'Moto', 'moto ', 'U3', 'u3', 'VL', 'PL', '', np.nan, None]
+SIREDO = [1, 12, 2, 5, 11, 14, 13, 0, np.nan]
+
+def _assert_parity(df):
+    expected = df.apply(_get_unified_category, axis=1)
+    pd.testing.assert_series_equal(unify_categories(df), expected, check_dtype=False, check_names=False)
+
+def _all_combinations():
+    labels, siredo = zip(*[(l, s) for l in LABELS for s in SIREDO])
+    return pd.DataFrame({'Category': list(labels), 'Category_SIREDO': list(siredo)})
+
+def test_parity_all_combinations():
+    _assert_parity(_all_combinations())
+
+def test_parity_categorical_labels():
+    df = _all_combinations()
+    df['Category'] = df['Category'].astype('category')
+    _assert_parity(df)
+
+def test_parity_string_siredo():
+    # Codes read as text never match the numeric SIREDO rules, as before
+    df = _all_combinations()
+    df['Category_SIREDO'] = df['Category_SIREDO'].map(lambda v: v if pd.isna(v) else str(int(v)))
+    _assert_parity(df)
+
+@pytest.mark.parametrize('missing', ['Category', 'Category_SIREDO'])
+def test_parity_missing_column(missing):
+    _assert_parity(_all_combinations().drop(columns=missing))
+
+def test_sterela_map_takes_precedence():
+    df = pd.DataFrame({'Category': ['Vélo', 'u3'], 'Category_SIREDO': [np.nan, np.nan], 'Category_Sterela': [7.0, np.nan]})
+    assert list(unify_categories(df, sterela_map={7: 'PL'})) == ['PL', 'VL']
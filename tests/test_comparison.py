@@ -0,0 +1,62 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import build_comparison_tables, comparison_for_categories
+
+CATEGORIES = ['Autre', 'Motos', 'PL', 'VL', 'Vélos']
+
+def _reference(df, cats):
+    """
+    Reference: the per-call aggregation that comparison_for_categories replaced, kept as is.
+    """
+    comp_df = df[df['UnifiedCategory'].isin(cats)].copy()
+    annual_vols = comp_df.groupby(['Year', 'UnifiedCategory'], observed=True)['Count'].sum().reset_index(name='Volume')
+    days_per_year = comp_df.groupby('Year', observed=True)['Date'].nunique().reset_index(name='NbDays')
+    annual_group = pd.merge(annual_vols, days_per_year, on='Year')
+    annual_group['TMJ'] = (annual_group['Volume'] / annual_group['NbDays']).round(0)
+    monthly_vols = comp_df.groupby(['Year', 'Month'], observed=True)['Count'].sum().reset_index(name='Volume')
+    days_per_month = comp_df.groupby(['Year', 'Month'], observed=True)['Date'].nunique().reset_index(name='NbDays')
+    monthly_group = pd.merge(monthly_vols, days_per_month, on=['Year', 'Month'])
+    monthly_group['TMJ_Month'] = (monthly_group['Volume'] / monthly_group['NbDays']).round(0)
+    return annual_group, monthly_group
+
+@pytest.fixture(scope='module')
+def daily():
+    """
+    Daily aggregate rows (one per day, direction and category) over two years; each category
+    is missing on some days, and 'Autre' is never counted.
+    """
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2022-05-01', '2023-09-30', freq='D')
+    rows = [(day, direction, cat) for day in days for direction in ('1', '2') for cat in CATEGORIES[1:]]
+    df = pd.DataFrame(rows, columns=['Date', 'Direction', 'UnifiedCategory'])
+    df = df[rng.random(len(df)) < 0.4].reset_index(drop=True)
+    df['Count'] = rng.integers(1, 200, len(df))
+    df['Year'] = df['Date'].dt.year
+    df['Month'] = df['Date'].dt.month
+    df['UnifiedCategory'] = df['UnifiedCategory'].astype(pd.CategoricalDtype(CATEGORIES))
+    return df
+
+def _normalized(df, keys):
+    return df.sort_values(keys).reset_index(drop=True)
+
+@pytest.mark.parametrize('cats', [list(c) for n in range(1, len(CATEGORIES) + 1) for c in combinations(CATEGORIES, n)])
+def test_parity_every_category_set(daily, cats):
+    annual, monthly = comparison_for_categories(build_comparison_tables(daily), cats)
+    expected_annual, expected_monthly = _reference(daily, cats)
+    if expected_annual.empty:
+        assert annual.empty and monthly.empty
+        return
+    pd.testing.assert_frame_equal(_normalized(annual, ['Year', 'UnifiedCategory']), _normalized(expected_annual, ['Year', 'UnifiedCategory']),
+                                  check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(_normalized(monthly, ['Year', 'Month']), _normalized(expected_monthly, ['Year', 'Month']),
+                                  check_dtype=False)
+
+def test_unknown_categories_are_ignored(daily):
+    tables = build_comparison_tables(daily)
+    assert all(frame.empty for frame in comparison_for_categories(tables, []))
+    annual, _ = comparison_for_categories(tables, ['VL', 'Piétons'])
+    pd.testing.assert_frame_equal(annual, comparison_for_categories(tables, ['VL'])[0])
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from utils import TZ, filter_by_date, local_day_bounds
+
+def _hourly(start, end):
+    hours = pd.date_range(pd.Timestamp(start, tz=TZ), pd.Timestamp(end, tz=TZ), freq='h')
+    return pd.DataFrame({'Datetime': hours, 'Count': 1})
+
+def test_bounds_are_local_midnights():
+    start, end = local_day_bounds('2023-10-29', '2023-10-29')
+    assert start == pd.Timestamp('2023-10-29', tz=TZ)
+    assert end == pd.Timestamp('2023-10-30', tz=TZ)
+    assert end - start == pd.Timedelta(hours=25)
+
+def test_filter_keeps_whole_dst_days():
+    df = _hourly('2023-03-25', '2023-10-31')
+    # 23-hour day (spring forward) and 25-hour day (fall back)
+    assert len(filter_by_date(df, '2023-03-26', '2023-03-26')) == 23
+    assert len(filter_by_date(df, '2023-10-29', '2023-10-29')) == 25
+    assert len(filter_by_date(df, '2023-10-01', '2023-10-29')) == 28 * 24 + 25
+
+def test_resorted_frame_is_masked():
+    # Sorted: sliced by binary search. Re-sorted (any flag in attrs would have been copied): masked
+    df = _hourly('2023-10-01', '2023-10-31')
+    df['Count'] = range(len(df))
+    df.attrs['time_sorted'] = True
+    shuffled = df.sort_values('Count', ascending=False)
+    assert shuffled.attrs.get('time_sorted')
+    expected = filter_by_date(df, '2023-10-10', '2023-10-12')
+    result = filter_by_date(shuffled, '2023-10-10', '2023-10-12')
+    assert len(result) == 72
+    pd.testing.assert_frame_equal(result.sort_values('Datetime'), expected)
+
+def test_filter_matches_daily_totals():
+    df = _hourly('2023-10-27', '2023-10-31')
+    daily = df.groupby(df['Datetime'].dt.tz_localize(None).dt.normalize())['Count'].sum()
+    assert filter_by_date(df, '2023-10-28', '2023-10-29')['Count'].sum() == daily.loc['2023-10-28':'2023-10-29'].sum()
+
+def test_missing_date_returns_none():
+    assert local_day_bounds(None, '2023-10-29') is None
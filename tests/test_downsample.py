@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from utils import minmax_downsample
+
+def _reference(values, n_buckets):
+    """
+    Reference: the min / max (first occurrence) and first missing value of each bucket, bucket by bucket.
+    """
+    n = len(values)
+    if n_buckets <= 0 or n <= 2 * n_buckets:
+        return np.arange(n)
+    kept = {0, n - 1}
+    bucket = np.arange(n) * n_buckets // n
+    for b in range(n_buckets):
+        positions = np.flatnonzero(bucket == b)
+        chunk = values[positions]
+        missing = np.isnan(chunk)
+        if missing.all():
+            kept.add(positions[0])
+            continue
+        kept.add(positions[np.nanargmin(chunk)])
+        kept.add(positions[np.nanargmax(chunk)])
+        if missing.any():
+            kept.add(positions[np.argmax(missing)])
+    return np.array(sorted(kept))
+
+@pytest.mark.parametrize('n, n_buckets', [(10, 0), (10, 5), (11, 5), (1000, 37), (5000, 800), (24 * 365, 1200)])
+def test_matches_reference(n, n_buckets):
+    rng = np.random.default_rng(n)
+    values = rng.poisson(20, n).astype(float)
+    values[rng.random(n) < 0.05] = np.nan
+    # A whole bucket of missing values (gap in the timeline)
+    values[n // 3:n // 3 + max(1, 3 * n // max(n_buckets, 1))] = np.nan
+    np.testing.assert_array_equal(minmax_downsample(values, n_buckets), _reference(values, n_buckets))
+
+def test_extremes_and_gaps_are_kept():
+    rng = np.random.default_rng(0)
+    values = rng.random(10000)
+    values[4000:4100] = np.nan
+    kept = minmax_downsample(values, 200)
+    assert len(kept) <= 3 * 200 + 2
+    assert np.nanargmin(values) in kept and np.nanargmax(values) in kept
+    assert 4000 in kept
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import DAYS_ORDER_FR, FRENCH_DAYS, heatmap_matrix, weekday_codes, weekday_counts
+
+def _reference_counts(start, end):
+    """
+    Reference: the day_name / value_counts count of the days of each weekday that weekday_counts replaced.
+    """
+    names = pd.date_range(start=start, end=end, freq='D').day_name().map(FRENCH_DAYS)
+    return names.value_counts().reindex(DAYS_ORDER_FR, fill_value=0).to_numpy()
+
+def _reference_matrix(df, days_per_weekday=None):
+    """
+    Reference: the groupby of the previous heatmaps, sum per day of the period (road, empty cells
+    at 0 as in the density heatmap) or mean per row (pedestrian, empty cells NaN).
+    """
+    weekday = df['Datetime'].dt.dayofweek
+    grouped = df.groupby([weekday, df['Hour']])['Count']
+    if days_per_weekday is None:
+        matrix = np.full((7, 24), np.nan)
+        for (day, hour), value in grouped.mean().items():
+            matrix[day, hour] = value
+        return matrix
+    matrix = np.zeros((7, 24))
+    for (day, hour), value in grouped.sum().items():
+        matrix[day, hour] = value
+    days = np.asarray(days_per_weekday, dtype=float)[:, None]
+    return np.divide(matrix, days, out=np.full(matrix.shape, np.nan), where=days > 0)
+
+@pytest.mark.parametrize('start, end', [
+    ('2023-01-01', '2023-01-01'), ('2023-01-02', '2023-01-08'), ('2023-03-15', '2023-11-02'),
+    ('2020-02-28', '2024-03-01'), ('2023-06-10', '2023-06-09'),
+])
+def test_weekday_counts(start, end):
+    np.testing.assert_array_equal(weekday_counts(start, end), _reference_counts(start, end))
+
+@pytest.fixture(scope='module')
+def cube():
+    """
+    Hourly counts on random hours of a few weeks, with missing values.
+    """
+    rng = np.random.default_rng(0)
+    hours = pd.date_range('2023-03-20', '2023-04-20', freq='h', tz='Europe/Paris')
+    df = pd.DataFrame({'Datetime': hours[rng.random(len(hours)) < 0.6]})
+    df['Hour'] = df['Datetime'].dt.hour
+    df['Count'] = rng.poisson(8, len(df)).astype(float)
+    df.loc[rng.random(len(df)) < 0.05, 'Count'] = np.nan
+    return df
+
+def test_mean_per_row(cube):
+    matrix = heatmap_matrix(weekday_codes(cube), cube['Hour'], cube['Count'])
+    np.testing.assert_allclose(matrix, _reference_matrix(cube))
+
+def test_sum_per_day_of_period(cube):
+    days = weekday_counts('2023-03-20', '2023-04-20')
+    matrix = heatmap_matrix(weekday_codes(cube), cube['Hour'], cube['Count'], days_per_weekday=days)
+    np.testing.assert_allclose(matrix, _reference_matrix(cube, days))
+
+def test_rows_without_values(cube):
+    # One passage per row (per-vehicle frames)
+    days = weekday_counts('2023-03-20', '2023-04-20')
+    matrix = heatmap_matrix(weekday_codes(cube), cube['Hour'], days_per_weekday=days)
+    np.testing.assert_allclose(matrix, _reference_matrix(cube.assign(Count=1.0), days))
+
+def test_weekday_without_days(cube):
+    # A period shorter than a week: weekdays absent from it are NaN
+    week = cube[cube['Datetime'] < pd.Timestamp('2023-03-23', tz='Europe/Paris')]
+    days = weekday_counts('2023-03-20', '2023-03-22')
+    matrix = heatmap_matrix(weekday_codes(week), week['Hour'], week['Count'], days_per_weekday=days)
+    np.testing.assert_allclose(matrix, _reference_matrix(week, days))
+    assert np.isnan(matrix[3:]).all()
+
+def test_weekday_codes_from_categorical(cube):
+    names = cube['Datetime'].dt.day_name().astype(pd.CategoricalDtype(list(FRENCH_DAYS)))
+    np.testing.assert_array_equal(weekday_codes(cube.assign(Weekday=names)), cube['Datetime'].dt.dayofweek.to_numpy())
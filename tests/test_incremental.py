@@ -0,0 +1,105 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cache import file_signature
+from data_loader import DataManager, merge_site_frames
+
+DIRECTION_COLUMN = 'direction_1_2 (1: vers col de la Bonette) (2: vers Jausiers)'
+SITE = {'id': 'col', 'name': 'Col', 'type': 'routier', 'coords': [44.3, 6.8]}
+
+def _export(path, start, periods, seed, rows=None):
+    """
+    Writes a small Sterela export: one passage every 7 minutes from a local start time. With rows,
+    only the first rows are written (the same export, before it grew).
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(pd.Timestamp(start, tz='Europe/Paris'), periods=periods, freq='7min').tz_convert('UTC')
+    pd.DataFrame({
+        'id': np.arange(periods),
+        'horodate_generated': times.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'lane_rank': 1,
+        'lane_col': rng.choice([1, 2], periods),
+        DIRECTION_COLUMN: rng.choice([1, 2], periods),
+        'categorySterela': rng.integers(1, 9, periods),
+        'categorySterela_label': rng.choice(['u3', 'Moto', 'Vélo', 'inconnu'], periods),
+        'category1': rng.choice([1, 2, 12, 13], periods),
+        'speed': [f"{v:.1f}".replace('.', ',') for v in rng.normal(50, 10, periods)],
+    }).head(rows).to_csv(path, sep=';', index=False, encoding='latin1')
+
+@pytest.fixture
+def site_root(tmp_path, monkeypatch):
+    """
+    Returns a function creating an application root (data/sites.json) with its own store.
+    """
+    dm = DataManager()
+    def make(name):
+        root = tmp_path / name
+        (root / 'data').mkdir(parents=True)
+        (root / 'data' / 'sites.json').write_text(json.dumps([SITE]))
+        (root / 'src' / SITE['id']).mkdir(parents=True)
+        return root
+    def use(root):
+        monkeypatch.setattr(DataManager, '_base_path', str(root))
+        dm.invalidate()
+        return dm
+    yield make, use
+    dm.invalidate()
+
+def _store(dm):
+    df = dm._read_store(SITE['id'])
+    return df.sort_values(['Datetime', 'Lane', 'Direction'], kind='stable').reset_index(drop=True)
+
+def test_incremental_build_matches_full_rebuild(site_root):
+    make, use = site_root
+    root = make('incremental')
+    src = root / 'src' / SITE['id']
+    _export(src / 'a.csv', '2022-05-30', 2000, seed=1)
+    _export(src / 'b.csv', '2022-07-10', 8000, seed=2, rows=1000)
+    dm = use(root)
+    dm.get_data(SITE['id'], csv_source_path=str(root / 'src'))
+
+    # b.csv grows into August and a new export covers 2023: the 2022-05 / 06 partitions are not rewritten
+    untouched = root / 'data' / 'parquet_store' / SITE['id'] / 'Year=2022' / 'Month=5'
+    before = {f: os.stat(untouched / f).st_mtime_ns for f in os.listdir(untouched)}
+    _export(src / 'b.csv', '2022-07-10', 8000, seed=2)
+    _export(src / 'c.csv', '2023-06-01', 1500, seed=3)
+    dm.get_data(SITE['id'], csv_source_path=str(root / 'src'), incremental=True)
+    assert {f: os.stat(untouched / f).st_mtime_ns for f in os.listdir(untouched)} == before
+    incremental = _store(dm)
+
+    full_root = make('full')
+    for name in ('a.csv', 'b.csv', 'c.csv'):
+        (full_root / 'src' / SITE['id'] / name).write_bytes((src / name).read_bytes())
+    dm = use(full_root)
+    dm.get_data(SITE['id'], csv_source_path=str(full_root / 'src'))
+    pd.testing.assert_frame_equal(incremental, _store(dm))
+
+def test_unparsable_changed_file_keeps_the_store(site_root):
+    make, use = site_root
+    root = make('unparsable')
+    src = root / 'src' / SITE['id']
+    _export(src / 'a.csv', '2022-05-30', 500, seed=1)
+    dm = use(root)
+    dm.get_data(SITE['id'], csv_source_path=str(root / 'src'))
+    store_dir = dm._parquet_path(SITE['id'])
+    signature = file_signature(store_dir)
+
+    (src / 'broken.csv').write_text("pas un export\n", encoding='latin1')
+    dm.get_data(SITE['id'], csv_source_path=str(root / 'src'), incremental=True)
+    assert file_signature(store_dir) == signature
+    # Left out of the manifest, so that the next build retries it
+    assert 'broken.csv' not in dm._load_manifest(SITE['id'])
+    assert 'a.csv' in dm._load_manifest(SITE['id'])
+
+def test_merge_replaces_reingested_rows():
+    times = pd.date_range('2022-06-01', periods=4, freq='h', tz='Europe/Paris')
+    stored = pd.DataFrame({'Datetime': times, 'Lane': 1, 'Direction': '1', 'Speed': [50.0, 51.0, 52.0, 53.0]})
+    new = pd.DataFrame({'Datetime': times[2:].append(pd.DatetimeIndex([times[-1] + pd.Timedelta(hours=1)])),
+                        'Lane': 1, 'Direction': '1', 'Speed': [62.0, 63.0, 64.0]})
+    merged = merge_site_frames(stored, new)
+    assert merged['Speed'].tolist() == [50.0, 51.0, 62.0, 63.0, 64.0]
+    assert merged['Datetime'].is_monotonic_increasing
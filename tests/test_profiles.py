@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import build_hourly_profiles, hourly_profile_window
+from utils import TZ, prefix_window_sum, season_mask
+
+def _reference(df, selected_days):
+    """
+    Reference: Count total and number of records per weekday x local hour of the rows of the
+    selected days, with a plain groupby.
+    """
+    local = df['Datetime'].dt.tz_localize(None)
+    rows = df[local.dt.normalize().isin(selected_days)]
+    local = rows['Datetime'].dt.tz_localize(None)
+    grouped = rows['Count'].groupby([local.dt.dayofweek, local.dt.hour]).agg(['sum', 'count'])
+    sums, counts = np.zeros((7, 24)), np.zeros((7, 24), dtype=np.int64)
+    for (weekday, hour), row in grouped.iterrows():
+        sums[weekday, hour], counts[weekday, hour] = row['sum'], row['count']
+    return sums, counts
+
+@pytest.fixture(scope='module')
+def records():
+    """
+    Hourly pedestrian records over two DST changes, with missing counts and a gap of several days.
+    """
+    rng = np.random.default_rng(0)
+    hours = pd.date_range(pd.Timestamp('2023-03-01', tz=TZ), pd.Timestamp('2023-11-15', tz=TZ), freq='h')
+    counts = rng.poisson(5, len(hours)).astype(float)
+    counts[rng.random(len(hours)) < 0.05] = np.nan
+    df = pd.DataFrame({'Datetime': hours, 'Count': counts})
+    gap = (df['Datetime'] >= pd.Timestamp('2023-07-10', tz=TZ)) & (df['Datetime'] < pd.Timestamp('2023-07-17', tz=TZ))
+    return df[~gap].reset_index(drop=True)
+
+def _assert_window(records, profiles, selected):
+    sums, counts = hourly_profile_window(profiles, selected)
+    expected_sums, expected_counts = _reference(records, profiles['days'][selected])
+    np.testing.assert_allclose(sums, expected_sums)
+    np.testing.assert_array_equal(counts, expected_counts)
+
+def test_whole_span(records):
+    profiles = build_hourly_profiles(records)
+    _assert_window(records, profiles, np.ones(len(profiles['days']), dtype=bool))
+
+def test_period_and_season(records):
+    profiles = build_hourly_profiles(records)
+    days = profiles['days']
+    period = (days >= '2023-03-20') & (days < '2023-10-30')
+    _assert_window(records, profiles, period)
+    _assert_window(records, profiles, period & season_mask(days, 6, 15, 8, 31))
+    # Season spanning the new year: two runs of days
+    _assert_window(records, profiles, season_mask(days, 11, 1, 3, 31))
+
+def test_random_days(records):
+    profiles = build_hourly_profiles(records)
+    selected = np.random.default_rng(1).random(len(profiles['days'])) < 0.5
+    _assert_window(records, profiles, selected)
+
+def test_no_day_selected(records):
+    profiles = build_hourly_profiles(records)
+    sums, counts = hourly_profile_window(profiles, np.zeros(len(profiles['days']), dtype=bool))
+    assert not sums.any() and not counts.any()
+
+def test_prefix_window_sum():
+    rng = np.random.default_rng(2)
+    values = rng.random((50, 3))
+    prefix = np.concatenate([np.zeros((1, 3)), np.cumsum(values, axis=0)])
+    for mask in (rng.random(50) < 0.3, np.ones(50, dtype=bool), np.zeros(50, dtype=bool)):
+        np.testing.assert_allclose(prefix_window_sum(prefix, mask), values[mask].sum(axis=0))
@@ -0,0 +1,52 @@
+import re
+
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+import report_generator as rg
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    rg._figure_cache.invalidate()
+    yield
+    rg._figure_cache.invalidate()
+
+def _report(figures):
+    return rg.generate_html_report(pd.DataFrame(), figures, 'test', kind='pedestrian',
+                                   start_date='2023-01-01', end_date='2023-01-31')
+
+def _div_ids(html):
+    return re.findall(r'<div id="([^"]+)" class="plotly-graph-div', html)
+
+def test_different_figures_never_share_an_entry():
+    first = go.Figure(go.Bar(y=[1, 2]), layout_title_text="Evolution")
+    second = go.Figure(go.Bar(y=[1, 3]), layout_title_text="Evolution")
+    html_first = _report({"Evolution Temporelle": first})
+    html_second = _report({"Evolution Temporelle": second})
+    assert rg._figure_cache.stats()['entries'] == 2
+    assert '[1,2]' in html_first and '[1,3]' in html_second
+    assert '[1,2]' not in html_second
+
+def test_hidden_trace_is_a_different_figure():
+    # Legend toggles are kept in the figure state exported from the dashboard
+    shown = go.Figure(go.Bar(y=[1, 2]))
+    hidden = go.Figure(go.Bar(y=[1, 2], visible='legendonly'))
+    assert rg._figure_html(shown) != rg._figure_html(hidden)
+    assert rg._figure_cache.stats()['entries'] == 2
+
+def test_same_figure_is_served_from_cache():
+    fig = go.Figure(go.Bar(y=[1, 2]))
+    rg._figure_html(fig)
+    # A dict from a Dash state has the same content as the figure it was built from
+    rg._figure_html(fig.to_plotly_json())
+    stats = rg._figure_cache.stats()
+    assert stats['entries'] == 1 and stats['hits'] == 1
+
+def test_identical_figures_get_unique_div_ids():
+    fig = go.Figure(go.Bar(y=[1, 2]))
+    html = _report({"A": fig, "B": fig.to_plotly_json()})
+    ids = _div_ids(html)
+    assert ids == [f"{rg.FIGURE_DIV_ID}-1", f"{rg.FIGURE_DIV_ID}-2"]
+    # Each id is also the target of its own newPlot call
+    assert all(html.count(f'"{div_id}"') == 3 for div_id in ids)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import build_hourly_cube, enforce_schema
+from utils import SYNTHESIS_CATEGORIES, compute_synthesis, day_types, passage_counts
+
+def _compute_metrics(sub_df, days_total, days_jo, days_we):
+    """
+    Reference: the per-cell metrics that compute_synthesis replaced, kept as is.
+    """
+    if sub_df.empty:
+        return [0, 0, 0, 0, "-"]
+    counts = passage_counts(sub_df)
+    total = int(counts.sum())
+    tmj = int(round(total / max(1, days_total)))
+    total_jo = counts[sub_df['DayType'] == 'JO'].sum()
+    tmj_jo = int(round(total_jo / max(1, days_jo))) if days_jo > 0 else 0
+    total_we = counts[sub_df['DayType'] == 'WE'].sum()
+    tmj_we = int(round(total_we / max(1, days_we))) if days_we > 0 else 0
+
+    if 'SpeedSum' in sub_df.columns:
+         nb_speeds = sub_df['SpeedCount'].sum()
+         vt = sub_df['SpeedSum'].sum() / nb_speeds if nb_speeds > 0 else np.nan
+         vt_str = "-" if pd.isna(vt) else f"{vt:.0f} km/h"
+    elif 'Speed' in sub_df.columns:
+         vt = sub_df['Speed'].mean()
+         vt_str = "-" if pd.isna(vt) else f"{vt:.0f} km/h"
+    else:
+         vt_str = "-"
+    return [total, tmj, tmj_jo, tmj_we, vt_str]
+
+def _reference(df, days_total, days_jo, days_we):
+    """
+    Reference: the synthesis table loop, one filtered copy and _compute_metrics call per cell.
+    """
+    results = {}
+    for sens_code in ['1', '2']:
+        for filter_cat in [*SYNTHESIS_CATEGORIES, None]:
+            d_data = df[df['Direction'].astype(str).str.contains(sens_code)]
+            if filter_cat:
+                d_data = d_data[d_data['UnifiedCategory'] == filter_cat]
+            results[(filter_cat, sens_code)] = _compute_metrics(d_data, days_total, days_jo, days_we)
+    return results
+
+@pytest.fixture(scope='module')
+def passages():
+    """
+    Per-vehicle rows over three weeks (with July 14): 'Autre' rows, missing speeds, and no PL in direction 2.
+    """
+    rng = np.random.default_rng(0)
+    n = 20000
+    start = pd.Timestamp('2023-07-03', tz='Europe/Paris')
+    df = pd.DataFrame({
+        'Datetime': start + pd.to_timedelta(np.sort(rng.integers(0, 21 * 86400, n)), unit='s'),
+        'Direction': rng.choice(['1', '2'], n),
+        'UnifiedCategory': rng.choice([*SYNTHESIS_CATEGORIES, 'Autre'], n),
+        'Speed': rng.normal(60, 15, n).round(1),
+    })
+    df.loc[rng.random(n) < 0.1, 'Speed'] = np.nan
+    df = df[~((df['Direction'] == '2') & (df['UnifiedCategory'] == 'PL'))].reset_index(drop=True)
+    df['DayType'] = day_types(df['Datetime'].dt.tz_localize(None).dt.normalize())
+    return df
+
+@pytest.mark.parametrize('days', [(21, 15, 6), (30, 22, 8), (21, 0, 6), (0, 0, 0)])
+def test_parity_per_vehicle_rows(passages, days):
+    assert compute_synthesis(passages, *days) == _reference(passages, *days)
+
+def test_parity_hourly_cube(passages):
+    cube = enforce_schema(build_hourly_cube(passages))
+    assert compute_synthesis(cube, 21, 15, 6) == _reference(cube, 21, 15, 6)
+    # The cube gives the same table as the rows it aggregates
+    assert compute_synthesis(cube, 21, 15, 6) == compute_synthesis(passages, 21, 15, 6)
+
+def test_parity_without_speed(passages):
+    rows = passages.drop(columns='Speed')
+    assert compute_synthesis(rows, 21, 15, 6) == _reference(rows, 21, 15, 6)
+
+def test_empty_frame(passages):
+    assert compute_synthesis(passages.iloc[:0], 21, 15, 6) == _reference(passages.iloc[:0], 21, 15, 6)
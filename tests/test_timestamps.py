@@ -0,0 +1,54 @@
+import pandas as pd
+
+from data_loader import parse_timestamps
+from utils import TZ
+
+def _reference(values):
+    """
+    Reference: the format='mixed' parsing that parse_timestamps replaced, in local time.
+    """
+    if values.dropna().astype(str).str.contains(r'(?:Z|[+-]\d{2}:?\d{2})$').mean() > 0.5:
+        return pd.to_datetime(values, format='mixed', errors='coerce', utc=True).dt.tz_convert(TZ)
+    parsed = pd.to_datetime(values, format='mixed', errors='coerce')
+    return parsed.dt.tz_localize(TZ, ambiguous='NaT', nonexistent='shift_forward')
+
+def _assert_parity(values):
+    pd.testing.assert_series_equal(parse_timestamps(values), _reference(values), check_names=False)
+
+def test_sterela_utc_timestamps():
+    values = pd.Series(['2023-03-26T00:59:59.123Z', '2023-03-26T01:00:00.5Z', '2023-10-29T00:30:00Z',
+                        '2023-10-29T01:30:00.000Z', None, '2023-10-29T02:30:00.000Z'] * 50)
+    _assert_parity(values)
+
+def test_offsets_across_dst():
+    # '+HH:MM' offsets take the vectorized path, the 'Z' row the mixed fallback
+    values = pd.Series(['2023-03-26T01:30:00+01:00', '2023-03-26T03:30:00+02:00', '2023-10-29T02:30:00+02:00',
+                        '2023-10-29T02:30:00+01:00', '2023-10-29T05:00:00Z'] * 40)
+    _assert_parity(values)
+
+def test_naive_local_timestamps():
+    # Ambiguous hour of the fall-back day: NaT, as before
+    values = pd.Series(pd.date_range('2023-10-28', '2023-10-30', freq='h').strftime('%Y-%m-%d %H:%M:%S'))
+    parsed = parse_timestamps(values)
+    pd.testing.assert_series_equal(parsed, _reference(values), check_names=False)
+    assert parsed.isna().sum() == 1
+
+def test_malformed_rows_become_nat(capsys):
+    values = pd.Series(['2023-06-01T10:00:00.000Z'] * 200 + ['n/a', '2023-06-01 12:00:00+0200', '2023-02-30T10:00:00Z'])
+    parsed = parse_timestamps(values, '/exports/site/export.csv')
+    pd.testing.assert_series_equal(parsed, _reference(values), check_names=False)
+    log = capsys.readouterr().out
+    assert log.startswith("export.csv: datetime format 'ISO8601'")
+    assert "2 row(s) sent to the mixed parser, 2 unparsable" in log
+
+def test_day_first_format():
+    # format='mixed' read these month first; the detected format reads them day first
+    values = pd.Series(['03/04/2023 08:00', '13/04/2023 08:00', '01/12/2023 23:15'])
+    parsed = parse_timestamps(values)
+    expected = pd.to_datetime(['2023-04-03 08:00', '2023-04-13 08:00', '2023-12-01 23:15']).tz_localize(TZ)
+    assert list(parsed) == list(expected)
+
+def test_parsed_column_is_converted(capsys):
+    values = pd.Series(pd.date_range('2023-06-01', periods=3, freq='h', tz='UTC'))
+    assert list(parse_timestamps(values, 'a.csv')) == list(values.dt.tz_convert(TZ))
+    assert capsys.readouterr().out == "a.csv: timestamps already parsed by the CSV engine\n"
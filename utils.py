@@ -1,4 +1,6 @@
 import pandas as pd
+import numpy as np
+from functools import lru_cache
 
 # --- Constants ---
 # Professional Palette (Flat/Modern)
@@ -68,84 +70,386 @@ TZ = "Europe/Paris"
 
 # --- Helpers ---
 
+def local_day_bounds(start_date, end_date):
+    """
+    Local [start, end) bounds of a date range with an inclusive end date: the local midnight of the
+    start date and the local midnight following the end date, so that a DST change day keeps its
+    23 or 25 hours (as the daily aggregates). None if a date is missing.
+    """
+    if not start_date or not end_date:
+        return None
+    start = pd.to_datetime(start_date).normalize()
+    end = pd.to_datetime(end_date).normalize() + pd.Timedelta(days=1)
+    # Local midnight always exists in Europe/Paris (DST changes happen at night)
+    return start.tz_localize(TZ), end.tz_localize(TZ)
+
 def filter_by_date(df, start_date, end_date):
     """
-    Robust date filtering using UTC comparison.
+    Robust date filtering using UTC comparison, over whole local days (see local_day_bounds).
+    Frames sorted by Datetime (as served by DataManager) are sliced by binary search and the
+    result is a view: it must not be modified. The order is checked on every call (one pass, far
+    cheaper than the mask and copy), as a flag would survive a re-sort of a derived frame.
     """
     if not start_date or not end_date:
         return df
     try:
-        mask = (df['Datetime'] >= pd.to_datetime(start_date).tz_localize(TZ)) & \
-               (df['Datetime'] < (pd.to_datetime(end_date).tz_localize(TZ) + pd.Timedelta(days=1)))
+        start, end = local_day_bounds(start_date, end_date)
+        if df['Datetime'].is_monotonic_increasing:
+            lo, hi = df['Datetime'].searchsorted([start, end], side='left')
+            return df.iloc[lo:hi]
+        mask = (df['Datetime'] >= start) & (df['Datetime'] < end)
         return df[mask].copy()
     except:
         return df
 
-def filter_by_season(df, start_month, start_day, end_month, end_day, road=True):
+def month_day(datetimes):
+    """
+    month * 100 + day key of datetimes (Series or DatetimeIndex), compared by the seasonal filter.
+    """
+    dt = datetimes.dt if isinstance(datetimes, pd.Series) else datetimes
+    return dt.month * 100 + dt.day
+
+def _in_season(md, start_md, end_md):
+    if start_md <= end_md:
+        return (md >= start_md) & (md <= end_md)
+    # Season spanning the new year (e.g. 01/11 - 31/03)
+    return (md >= start_md) | (md <= end_md)
+
+def easter_sunday(year):
+    """
+    Date of Easter Sunday (Gregorian calendar, anonymous computus).
+    """
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return pd.Timestamp(year=year, month=month, day=day)
+
+@lru_cache(maxsize=None)
+def french_holidays(year):
+    """
+    French public holidays of a year (fixed dates, Easter Monday, Ascension and Whit Monday).
+    """
+    fixed = [(1, 1), (5, 1), (5, 8), (7, 14), (8, 15), (11, 1), (11, 11), (12, 25)]
+    easter = easter_sunday(year)
+    days = [pd.Timestamp(year=year, month=m, day=d) for m, d in fixed]
+    days += [easter + pd.Timedelta(days=n) for n in (1, 39, 50)]
+    return tuple(sorted(days))
+
+def _day_numbers(days):
+    # Days since 1970-01-01 of naive local days (Series or DatetimeIndex, midnight)
+    return np.asarray(days, dtype='datetime64[ns]').astype('datetime64[D]').astype('int64')
+
+def is_holiday(days):
+    """
+    Boolean array: naive local days (Series or DatetimeIndex, midnight) that are French public holidays.
+    """
+    numbers = _day_numbers(days)
+    if len(numbers) == 0:
+        return np.zeros(0, dtype=bool)
+    first, last = pd.Timestamp(numbers.min(), unit='D').year, pd.Timestamp(numbers.max(), unit='D').year
+    holidays = [h for year in range(first, last + 1) for h in french_holidays(year)]
+    return np.isin(numbers, _day_numbers(pd.DatetimeIndex(holidays)))
+
+def day_types(days):
+    """
+    Day type of naive local days (Series or DatetimeIndex, midnight): 'WE' for Saturdays, Sundays
+    and public holidays, 'JO' for the other days. Shared by the DayType column of the road rows
+    and the day counts of the TMJ JO / WE, so that numerators and denominators agree.
+    """
+    # 1970-01-01 was a Thursday (Monday = 0)
+    weekday = (_day_numbers(days) + 3) % 7
+    return np.where((weekday >= 5) | is_holiday(days), 'WE', 'JO')
+
+def calendar_table(first_day, last_day):
+    """
+    One row per day between two dates (naive Timestamps, included): Date, MonthDay, IsWE,
+    IsHoliday (French public holidays) and DayType (see day_types).
+    DataManager caches one per site, over the span of its data (see DataManager.get_calendar).
+    """
+    days = pd.date_range(start=first_day, end=last_day, freq='D')
+    return pd.DataFrame({
+        'Date': days,
+        'MonthDay': month_day(days).astype('int16'),
+        'IsWE': days.dayofweek >= 5,
+        'IsHoliday': is_holiday(days),
+        'DayType': day_types(days),
+    })
+
+def season_mask(datetimes, start_month, start_day, end_month, end_day):
+    """
+    Boolean array: datetimes (Series or DatetimeIndex) between two month/day bounds, whatever the year.
+    """
+    return np.asarray(_in_season(month_day(datetimes), int(start_month) * 100 + int(start_day), int(end_month) * 100 + int(end_day)))
+
+def filter_by_season(df, start_month, start_day, end_month, end_day, road=True, calendar=None):
+    """
+    Keeps the rows between two month/day bounds, whatever the year.
+    For road counters, also returns the theoretical number of days (all, JO, WE) of the season
+    over the data span: days without any passage are absent from road datasets. They are read from
+    calendar (calendar_table of the site, covering the frame), sliced to that span, or from a
+    calendar built for it.
+    """
     if df.empty: 
         return df, 0
     
-    # 1. Filtrage du DataFrame original (ton code optimisé)
     sm, sd = int(start_month), int(start_day)
     em, ed = int(end_month), int(end_day)
-    
-    dt_col = df['Datetime'].dt
-    current_md = dt_col.month * 100 + dt_col.day
-    
     start_md = sm * 100 + sd
     end_md = em * 100 + ed
     
-    if start_md <= end_md:
-        mask = (current_md >= start_md) & (current_md <= end_md)
-    else:
-        mask = (current_md >= start_md) | (current_md <= end_md)
-    
-    df_filtered = df.loc[mask].copy()
+    # MonthDay is stored with the site data (computed here for stores built before it existed)
+    current_md = df['MonthDay'] if 'MonthDay' in df.columns else month_day(df['Datetime'])
+    df_filtered = df.loc[_in_season(current_md, start_md, end_md)].copy()
     if not road:
         # si ce n'est pas un compteur routier, on ne calcule pas les jours théoriques car tous les jours de comptage apparaissent dans les données
         # lorsqu'aucun passage n'est détecté (contrairement aux compteurs routiers où les jours sans passage sont absents du dataset)
         return df_filtered
 
-    # 2. Calcul du calendrier théorique complet
-    # On prend les bornes réelles de ton dataset
-    first_date = df['Datetime'].min().normalize()
-    last_date = df['Datetime'].max().normalize()
-    
-    # On génère TOUS les jours entre ces deux dates
-    full_range = pd.date_range(start=first_date, end=last_date, freq='D')
-    full_range_df = pd.DataFrame({'Date': full_range})
-    
-    # 3. On applique le filtre saisonnier sur ce calendrier complet
-    range_md = full_range.month * 100 + full_range.day
-    
-    if start_md <= end_md:
-        range_mask = (range_md >= start_md) & (range_md <= end_md)
+    # Calendrier théorique complet entre les bornes réelles du dataset
+    if df['Datetime'].is_monotonic_increasing:
+        first_date, last_date = df['Datetime'].iloc[0], df['Datetime'].iloc[-1]
+    else:
+        first_date, last_date = df['Datetime'].min(), df['Datetime'].max()
+    first_day, last_day = first_date.tz_localize(None).normalize(), last_date.tz_localize(None).normalize()
+    if calendar is None:
+        calendar = calendar_table(first_day, last_day)
     else:
-        range_mask = (range_md >= start_md) | (range_md <= end_md)
+        lo, hi = calendar['Date'].searchsorted([first_day, last_day], side='left')
+        calendar = calendar.iloc[lo:hi + 1]
     
-    # Le nombre de jours total (théorique) est la somme des True dans le masque
-    total_theoretical_days = range_mask.sum()
-    full_range_df['DayName'] = full_range_df['Date'].dt.day_name()
-    full_range_df['IsWE'] = full_range_df['DayName'].isin(['Saturday', 'Sunday'])
+    # On applique le filtre saisonnier sur ce calendrier complet
+    range_mask = _in_season(calendar['MonthDay'].to_numpy(), start_md, end_md)
+    is_we = (calendar['DayType'] == 'WE').to_numpy()
     
-    return df_filtered, {'nb_full_days' : total_theoretical_days, 'nb_JO_days': len(full_range_df[(range_mask) & ~full_range_df['IsWE']]), 'nb_WE_days': len(full_range_df[range_mask & full_range_df['IsWE']])}
+    return df_filtered, {'nb_full_days': int(range_mask.sum()), 'nb_JO_days': int((range_mask & ~is_we).sum()), 'nb_WE_days': int((range_mask & is_we).sum())}
 
-def compute_metrics(sub_df, days_total, days_jo, days_we):
+def resolution_for_span(start, end):
     """
-    Returns [Total, TMJ, TMJ_JO, TMJ_WE, SpeedStr]
+    Timeline resolution fitting a visible range: 'M' (monthly) beyond 400 days, 'H' (hourly)
+    under 14 days, 'D' (daily) otherwise.
     """
-    if sub_df.empty:
-        return [0, 0, 0, 0, "-"]    
-    total = len(sub_df)
-    tmj = int(round(total / max(1, days_total)))
-    sub_jo = sub_df[sub_df['DayType'] == 'JO']
-    tmj_jo = int(round(len(sub_jo) / max(1, days_jo))) if days_jo > 0 else 0
-    sub_we = sub_df[sub_df['DayType'] == 'WE']
-    tmj_we = int(round(len(sub_we) / max(1, days_we))) if days_we > 0 else 0
-    
-    if 'Speed' in sub_df.columns:
-         vt = sub_df['Speed'].mean()
-         vt_str = "-" if pd.isna(vt) else f"{vt:.0f} km/h"
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    if days > 400:
+        return 'M'
+    if days < 14:
+        return 'H'
+    return 'D'
+
+def weekday_counts(start, end):
+    """
+    Number of Mondays ... Sundays between two dates (included), in closed form.
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    nb_days = (end - start).days + 1
+    if nb_days <= 0:
+        return np.zeros(7, dtype=np.int64)
+    full_weeks, remainder = divmod(nb_days, 7)
+    counts = np.full(7, full_weeks, dtype=np.int64)
+    counts[(start.dayofweek + np.arange(remainder)) % 7] += 1
+    return counts
+
+def weekday_codes(df):
+    """
+    Weekday numbers (Monday = 0) of the rows: the codes of the Weekday categorical when it has
+    the standard categories, computed from Datetime otherwise.
+    """
+    weekday = df.get('Weekday')
+    if isinstance(getattr(weekday, 'dtype', None), pd.CategoricalDtype) and list(weekday.cat.categories) == list(FRENCH_DAYS):
+        return weekday.cat.codes.to_numpy()
+    return df['Datetime'].dt.dayofweek.to_numpy()
+
+def heatmap_matrix(weekdays, hours, values=None, days_per_weekday=None):
+    """
+    7 x 24 matrix (Monday first, hours 0-23) of the values (1 per row if None) summed per weekday
+    and hour with a single bincount (missing values are skipped). Normalized per weekday by days_per_weekday (e.g. weekday_counts
+    of the period) or, if None, by the number of rows of each cell (mean).
+    Cells without any day / row are NaN.
+    """
+    weekdays = np.asarray(weekdays, dtype=np.int64)  # int8 codes would overflow in weekday * 24
+    hours = np.asarray(hours, dtype=np.int64)
+    valid = (weekdays >= 0) & (weekdays < 7) & (hours >= 0) & (hours < 24)
+    if values is not None:
+        values = np.asarray(values, dtype=float)
+        valid &= ~np.isnan(values)  # skipped like missing values in a pandas sum / mean
+    cells = weekdays[valid] * 24 + hours[valid]
+    weights = None if values is None else values[valid]
+    sums = np.bincount(cells, weights=weights, minlength=7 * 24).reshape(7, 24).astype(float)
+    if days_per_weekday is not None:
+        divisor = np.broadcast_to(np.asarray(days_per_weekday, dtype=float)[:, None], sums.shape)
+    else:
+        divisor = np.bincount(cells, minlength=7 * 24).reshape(7, 24).astype(float)
+    return np.divide(sums, divisor, out=np.full(sums.shape, np.nan), where=divisor > 0)
+
+def prefix_window_sum(prefix, mask):
+    """
+    Sum of the rows of an array over the True runs of a mask, from its prefix sums along the first
+    axis (prefix[i] = sum of rows < i, len(prefix) = len(mask) + 1): two gathers per run of the mask.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], np.asarray(mask, dtype=np.int8), [0]])))
+    starts, ends = edges[::2], edges[1::2]
+    return prefix[ends].sum(axis=0) - prefix[starts].sum(axis=0)
+
+def minmax_downsample(values, n_buckets):
+    """
+    Positions (sorted) of the points kept to draw a series on about n_buckets pixels: the min
+    and the max of each bucket of consecutive points, plus the first missing value of a bucket
+    so that the gaps of the line stay visible. All positions if the series is short enough.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n_buckets <= 0 or n <= 2 * n_buckets:
+        return np.arange(n)
+    bucket = np.arange(n) * n_buckets // n
+    starts = np.searchsorted(bucket, np.arange(n_buckets))
+    missing = np.isnan(values)
+    # Within each bucket, lexsort puts the wanted point first (ties: first occurrence)
+    lowest = np.lexsort((np.where(missing, np.inf, values), bucket))[starts]
+    highest = np.lexsort((np.where(missing, np.inf, -values), bucket))[starts]
+    first_missing = np.lexsort((~missing, bucket))[starts]
+    first_missing = first_missing[missing[first_missing]]
+    return np.unique(np.concatenate([lowest, highest, first_missing, [0, n - 1]]))
+
+def centered_rolling_mean(matrix, window):
+    """
+    Centered rolling mean of each row of a 2D array over `window` columns, the missing values
+    (NaN) being skipped: like Series.rolling(window, center=True, min_periods=1).mean() per row,
+    with cumulative sums instead of a Python loop. NaN where a window has no value.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    valid = ~np.isnan(matrix)
+    half = window // 2
+    # Column j of the result covers columns j - half .. j + half: cumsum[j + window] - cumsum[j] once padded
+    pad = ((0, 0), (half + 1, window - half - 1))
+    sums = np.cumsum(np.pad(np.where(valid, matrix, 0.0), pad), axis=1)
+    counts = np.cumsum(np.pad(valid.astype(np.int64), pad), axis=1)
+    window_sums = sums[:, window:] - sums[:, :-window]
+    window_counts = counts[:, window:] - counts[:, :-window]
+    return np.divide(window_sums, window_counts, out=np.full(matrix.shape, np.nan), where=window_counts > 0)
+
+def passage_counts(df):
+    """
+    Number of passages per row: the Count column of the hourly cube, 1 for per-vehicle rows.
+    """
+    if 'Count' in df.columns:
+        return df['Count']
+    return pd.Series(1, index=df.index)
+
+SYNTHESIS_CATEGORIES = ['Vélos', 'Motos', 'VL', 'PL']
+
+def compute_synthesis(df, days_total, days_jo, days_we, categories=SYNTHESIS_CATEGORIES, directions=('1', '2')):
+    """
+    Metrics of every cell of the synthesis table in a single grouped pass, on per-vehicle rows as
+    well as on the hourly cube (Count / SpeedSum / SpeedCount).
+    Returns {(category, direction): [Total, TMJ, TMJ_JO, TMJ_WE, SpeedStr]}, category None
+    being all categories. A direction code matches every Direction containing it.
+    """
+    if df.empty:
+        return {(cat, d): [0, 0, 0, 0, "-"] for cat in [*categories, None] for d in directions}
+
+    counts = passage_counts(df)
+    if 'SpeedSum' in df.columns:
+        speed_sum, speed_count = df['SpeedSum'], df['SpeedCount']
+    elif 'Speed' in df.columns:
+        speed_sum, speed_count = df['Speed'], df['Speed'].notna()
     else:
-         vt_str = "-"
-    return [total, tmj, tmj_jo, tmj_we, vt_str]
+        speed_sum = speed_count = None
+    cells = pd.DataFrame({'Count': counts.to_numpy()}, index=df.index)
+    if speed_sum is not None:
+        cells['SpeedSum'] = speed_sum.to_numpy()
+        cells['SpeedCount'] = speed_count.to_numpy()
+    keys = [df['Direction'], df['UnifiedCategory'], df['DayType']]
+    grouped = cells.groupby(keys, observed=True, dropna=False).sum().reset_index()
+
+    direction_str = grouped['Direction'].astype(str)
+    category = grouped['UnifiedCategory']
+    results = {}
+    for d in directions:
+        in_direction = direction_str.str.contains(d, regex=False).to_numpy()
+        for cat in [*categories, None]:
+            mask = in_direction if cat is None else in_direction & (category == cat).to_numpy()
+            sub = grouped[mask]
+            if sub.empty:
+                results[(cat, d)] = [0, 0, 0, 0, "-"]
+                continue
+            total = int(sub['Count'].sum())
+            tmj = int(round(total / max(1, days_total)))
+            total_jo = sub.loc[sub['DayType'] == 'JO', 'Count'].sum()
+            tmj_jo = int(round(total_jo / max(1, days_jo))) if days_jo > 0 else 0
+            total_we = sub.loc[sub['DayType'] == 'WE', 'Count'].sum()
+            tmj_we = int(round(total_we / max(1, days_we))) if days_we > 0 else 0
+            vt_str = "-"
+            if speed_sum is not None:
+                nb_speeds = sub['SpeedCount'].sum()
+                if nb_speeds > 0:
+                    vt_str = f"{sub['SpeedSum'].sum() / nb_speeds:.0f} km/h"
+            results[(cat, d)] = [total, tmj, tmj_jo, tmj_we, vt_str]
+    return results
+
+PEDESTRIAN_INDICATORS = [
+    "Fréquentation totale",
+    "Moyenne journalière (FMJ)",
+    "Moyenne jours ouvrés (JO)",
+    "Moyenne week-end (WE)",
+    "Jour du pic de fréquentation",
+    "Pic de fréquentation",
+    "Jour de la semaine le plus fréquenté"
+]
+
+def pedestrian_day_counts(daily, start_date, end_date, is_seasonal=False):
+    """
+    (all, JO, WE) days the pedestrian averages are computed over: the days of the selected period,
+    or for a season the days it contains in the daily totals.
+    """
+    if is_seasonal:
+        nb_days_total = len(daily)
+        nb_days_we = int(daily['IsWE'].sum())
+        return nb_days_total, nb_days_total - nb_days_we, nb_days_we
+    counts = weekday_counts(start_date or daily.index[0], end_date or daily.index[-1])
+    return int(counts.sum()), int(counts[:5].sum()), int(counts[5:].sum())
+
+def compute_pedestrian_metrics(daily, nb_days_total, nb_days_jo, nb_days_we):
+    """
+    Computes: [Total, Avg Daily, Avg Workday, Avg Weekend, Peak Day, Peak Count, Max Day of Week]
+    from a slice of the daily totals table (DataManager.get_daily_totals), as in PEDESTRIAN_INDICATORS.
+    """
+    if daily.empty:
+        return ["-"] * 8
+        
+    counts = daily['Count'].to_numpy()
+    is_we = daily['IsWE'].to_numpy()
+    
+    total = counts.sum()
+    avg_daily = total / max(1, nb_days_total)
+    
+    # JO / WE
+    avg_jo = counts[~is_we].sum() / max(1, nb_days_jo) if nb_days_jo > 0 else 0
+    avg_we = counts[is_we].sum() / max(1, nb_days_we) if nb_days_we > 0 else 0
+    
+    # Peak
+    peak_pos = int(counts.argmax())
+    peak_day = daily.index[peak_pos].strftime('%d/%m/%Y')
+    peak_count = counts[peak_pos]
+        
+    # Busiest Day of Week (average daily count per weekday)
+    weekday = daily['Weekday'].to_numpy()
+    nb_days = np.bincount(weekday, minlength=7)
+    weekday_avg = np.bincount(weekday, weights=counts, minlength=7) / np.maximum(nb_days, 1)
+    weekday_avg[nb_days == 0] = -np.inf
+    max_day = DAYS_ORDER_FR[int(weekday_avg.argmax())]
+
+    return [
+        f"{int(total):,}".replace(",", " "),
+        f"{int(round(avg_daily)):,}".replace(",", " "),
+        f"{int(round(avg_jo)):,}".replace(",", " "),
+        f"{int(round(avg_we)):,}".replace(",", " "),
+        peak_day,
+        f"{int(peak_count):,}".replace(",", " "),
+        max_day
+    ]